@@ -1,21 +1,26 @@
 from app.config import config_dict
 from datetime import datetime
 from flask import Flask
-from flask_migrate import Migrate
 from .models import db
+from . import database, hashing, metrics, startup, user_cache
+from .numeric_body import numeric_body_cli
 from flask_restx import Api
-from app.routers.users import user_namespace
-from app.routers.blog_posts import blogpost_namespace
-from app.routers.auth import auth_namespace
 from flask_jwt_extended import JWTManager
 
 # app
 def create_app(config=config_dict['dev']):
     app = Flask(__name__)
     app.config.from_object(config)
+    database.init_app(app)
     db.init_app(app)
-    migrate = Migrate(app, db)
+    hashing.init_app(app)
+    metrics.init_app(app)
+    if startup.wants_migrate(app):
+        from flask_migrate import Migrate
+        migrate = Migrate(app, db)
     jwt = JWTManager(app)
+    user_cache.init_app(app, jwt)
+    app.cli.add_command(numeric_body_cli)
 
     now = datetime.now()
 
@@ -32,7 +37,5 @@ def create_app(config=config_dict['dev']):
         authorizations=authorizations, security='api_key'
     )
 
-    api.add_namespace(user_namespace)
-    api.add_namespace(blogpost_namespace)
-    api.add_namespace(auth_namespace)
+    startup.init_app(app, api)
     return app
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""Async (ASGI) entry point for the read-heavy endpoints.
+
+GET /blog_posts/bulkFetch, GET /blog_posts/<id> and the /users listings
+are served here on SQLAlchemy's async engine, so a slow query waits on the
+event loop instead of holding a worker thread. Responses are byte-for-byte
+those of the Flask handlers: the same models and compiled serializers, the
+same ETags, and JWT validation and its error responses come from the
+Flask app's JWTManager. Every other request is handed to the Flask app
+through asgiref's WsgiToAsgi.
+
+The async URL is ASYNC_DATABASE_URI, or SQLALCHEMY_DATABASE_URI with its
+driver swapped for asyncpg / aiosqlite.
+"""
+import io
+import re
+import sys
+import jwt
+from flask_jwt_extended import verify_jwt_in_request
+from sqlalchemy import desc, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.exceptions import BadRequest
+from werkzeug.http import is_resource_modified
+from werkzeug.wrappers import Request
+from app.conditional import listing_validators, validator_headers
+from app.models import BlogPost, ChangeCounter, User
+from app.routers.blog_posts import (blogpost_detailed_model, blogpost_model, bulk_fetch_statement,
+                                    decode_cursor, encode_cursor, search_limit, version_validators)
+from app.routers.users import user_model
+from app.serializer import compile_model, dumps
+from app.streaming import NDJSON, stream_format
+from app.user_cache import CurrentUser
+from asgiref.wsgi import WsgiToAsgi
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+serialize_detailed_post = compile_model(blogpost_detailed_model)
+serialize_post = compile_model(blogpost_model, skip_none=True)
+serialize_user = compile_model(user_model)
+
+
+def async_database_uri(config):
+    if config.get('ASYNC_DATABASE_URI'):
+        return config['ASYNC_DATABASE_URI']
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def wsgi_environ(scope):
+    """Just enough of a WSGI environ for werkzeug's Request and Flask's request context."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f'HTTP_{key}'
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsyncResponse:
+    def __init__(self, body=b'', status=200, headers=None, mimetype='application/json'):
+        self.body = body
+        self.status = status
+        self.headers = dict(headers or {})
+        if mimetype and body is not None:
+            self.headers.setdefault('Content-Type', mimetype)
+
+    @classmethod
+    def from_flask(cls, response):
+        return cls(response.get_data(), response.status_code, response.headers.to_wsgi_list(), None)
+
+    async def __call__(self, send, head=False):
+        headers = [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in self.headers.items()]
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+        if head or self.body is None:
+            await send({'type': 'http.response.body', 'body': b''})
+        elif isinstance(self.body, bytes):
+            await send({'type': 'http.response.body', 'body': self.body})
+        else:
+            async for chunk in self.body:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+
+def json_response(data, status=200, headers=None):
+    return AsyncResponse(dumps(data) + b'\n', status, headers)
+
+
+def not_modified_or(request, validators, vary=()):
+    # the 304 half of app.conditional.conditional
+    if validators is None:
+        return None, {}
+    etag, last_modified = validators
+    headers = validator_headers(etag, last_modified, vary)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return AsyncResponse(None, 304, headers), headers
+    return None, headers
+
+
+class AsyncReadApp:
+
+    def __init__(self, flask_app, **engine_options):
+        self.flask_app = flask_app
+        self.engine_options = engine_options
+        self.engine = None
+        self.fallback = WsgiToAsgi(flask_app)
+        self.routes = [
+            (re.compile(r'/blog_posts/bulkFetch'), self.bulk_fetch, True),
+            (re.compile(r'/blog_posts/(?P<blog_post_id>\d+)'), self.get_post, True),
+            (re.compile(r'/users/(?P<order>ascending|descending)_id'), self.list_users, False),
+        ]
+
+    def get_engine(self):
+        # created on first use so importing the module never needs the async driver
+        if self.engine is None:
+            self.engine = create_async_engine(async_database_uri(self.flask_app.config), **self.engine_options)
+        return self.engine
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            for pattern, handler, authenticated in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match is not None:
+                    request = Request(wsgi_environ(scope))
+                    response = await self.authenticate(request) if authenticated else None
+                    if response is None:
+                        response = await handler(request, **match.groupdict())
+                    return await response(send, head=scope['method'] == 'HEAD')
+
+        return await self.fallback(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def authenticate(self, request):
+        """Run jwt_required()'s checks; returns the error response, or None when authorized."""
+        user_id = self.token_user_id(request)
+        cache = self.flask_app.extensions['user_cache']
+        if user_id is not None and cache.get(user_id) is None:
+            # warm the user cache here so the shared user loader never
+            # queries synchronously on the event loop
+            async with self.get_engine().connect() as conn:
+                user = (await conn.execute(select(User.id, User.email, User.name).where(User.id == user_id))).first()
+            if user is not None:
+                cache.set(user.id, CurrentUser(user.id, user.email, user.name))
+
+        with self.flask_app.request_context(request.environ):
+            try:
+                verify_jwt_in_request()
+                return None
+            except Exception as e:
+                return AsyncResponse.from_flask(self.flask_app.make_response(self.flask_app.handle_user_exception(e)))
+
+    @staticmethod
+    def token_user_id(request):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme != 'Bearer' or not token:
+            return None
+        try:
+            # only picks the user to prefetch; verify_jwt_in_request checks
+            # the signature and reports any problem with the token
+            return jwt.decode(token, options={'verify_signature': False}).get('user_id')
+        except jwt.InvalidTokenError:
+            return None
+
+    async def bulk_fetch(self, request):
+        limit = request.headers.get('Limit')
+        search = request.headers.get('Search')
+        raw_cursor = request.headers.get('Cursor') or request.args.get('Cursor')
+        try:
+            cursor = decode_cursor(raw_cursor) if raw_cursor else None
+        except BadRequest as e:
+            return json_response({'message': e.description}, 400)
+
+        async with self.get_engine().connect() as conn:
+            counters = {row.table_name: row for row in await conn.execute(
+                ChangeCounter.read_statement(('blog_posts', 'users'))
+            )}
+            validators = listing_validators(counters, ('blog_posts', 'users'), limit, search, raw_cursor)
+            response, headers = not_modified_or(request, validators, ('Limit', 'Search', 'Cursor'))
+            if response is not None:
+                return response
+            # titles are matched with LIKE; the trigram index lives in the WSGI workers
+            if search:
+                limit = search_limit(limit, self.flask_app.config)
+            blog_posts = (await conn.execute(bulk_fetch_statement(limit, search, cursor))).all()
+
+        if limit and blog_posts and len(blog_posts) == int(limit):
+            headers['Next-Cursor'] = encode_cursor(blog_posts[-1].post_id)
+        return json_response(serialize_detailed_post(blog_posts), 200, headers)
+
+    async def get_post(self, request, blog_post_id):
+        async with self.get_engine().connect() as conn:
+            post = (await conn.execute(
+                select(BlogPost.id, BlogPost.title, BlogPost.body, BlogPost.date, BlogPost.user_id,
+                       BlogPost.version, BlogPost.updated_at).where(BlogPost.id == int(blog_post_id))
+            )).first()
+        if post is None:
+            return json_response(serialize_post({"message": "post not found"}), 404)
+
+        response, headers = not_modified_or(request, version_validators(post))
+        if response is not None:
+            return response
+        return json_response(serialize_post(post), 200, headers)
+
+    async def list_users(self, request, order):
+        fmt = stream_format(request)
+        async with self.get_engine().connect() as conn:
+            counters = {row.table_name: row for row in await conn.execute(ChangeCounter.read_statement(('users',)))}
+        response, headers = not_modified_or(request, listing_validators(counters, ('users',), f'{order}_id', fmt))
+        if response is not None:
+            return response
+
+        query = select(User.__table__).order_by(User.id if order == 'ascending' else desc(User.id))
+        if fmt is None:
+            async with self.get_engine().connect() as conn:
+                users = (await conn.execute(query)).all()
+            return json_response(serialize_user(users), 200, headers)
+        mimetype = NDJSON if fmt == 'ndjson' else 'application/json'
+        return AsyncResponse(self.stream_users(query, fmt), 200, headers, mimetype)
+
+    async def stream_users(self, query, fmt):
+        async with self.get_engine().connect() as conn:
+            result = await conn.stream(query)
+            if fmt == 'ndjson':
+                async for user in result:
+                    yield dumps(serialize_user(user)) + b'\n'
+                return
+
+            yield b'['
+            separator = b''
+            async for user in result:
+                yield separator + dumps(serialize_user(user))
+                separator = b','
+            yield b']'
@@ -0,0 +1,66 @@
+from functools import wraps
+from hashlib import sha1
+from flask import Response, request
+from flask_restx.utils import unpack
+from app.models import ChangeCounter
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+
+
+def validator_headers(etag, last_modified, vary):
+    headers = {'ETag': quote_etag(etag)}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    if vary:
+        headers['Vary'] = ', '.join(vary)
+    return headers
+
+
+def conditional(validators, vary=()):
+    """Answer If-None-Match / If-Modified-Since before the handler runs.
+
+    validators(**view_args) returns (etag, last_modified) computed from
+    version counters alone, or None when the resource has no validators
+    (e.g. it does not exist). A match is answered with an empty 304, so the
+    rows are never loaded or marshalled; otherwise the handler's response
+    carries the same ETag and Last-Modified. The decorator belongs above
+    marshal_with and streamable.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            current = validators(**kwargs)
+            if current is None:
+                return f(*args, **kwargs)
+            etag, last_modified = current
+            headers = validator_headers(etag, last_modified, vary)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                return Response(status=304, headers=headers)
+
+            result = f(*args, **kwargs)
+            if isinstance(result, Response):
+                if result.status_code == 200:
+                    result.headers.extend(headers)
+                return result
+            data, code, result_headers = unpack(result)
+            if code != 200:
+                return result
+            return data, code, dict(result_headers or {}, **headers)
+        return wrapper
+    return decorator
+
+
+def listing_validators(counters, table_names, *parts):
+    """ETag and Last-Modified for a listing over the given tables.
+
+    The ETag combines each table's ChangeCounter row with a digest of
+    whatever else shapes the listing (paging, search, format).
+    """
+    if any(name not in counters for name in table_names):
+        return None
+    versions = '-'.join(f'{name}.{counters[name].version}' for name in table_names)
+    digest = sha1(repr(parts).encode()).hexdigest()[:16]
+    return f'{versions}-{digest}', max(counters[name].updated_at for name in table_names)
+
+
+def table_validators(table_names, *parts):
+    return listing_validators(ChangeCounter.read(*table_names), table_names, *parts)
@@ -0,0 +1,119 @@
+import sqlite3
+from itertools import cycle
+from threading import Lock
+from time import monotonic
+from flask import has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+@event.listens_for(Engine, 'connect')
+def enforce_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores the models' foreign keys unless asked, PostgreSQL does not
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+
+class ReplicaSet:
+    """Round-robin over the replica binds, skipping replicas that are down.
+
+    A replica is probed with a checkout at most every REPLICA_CHECK_SECONDS;
+    one that fails is left alone for REPLICA_RETRY_SECONDS, and reads go to
+    the primary while no replica is available.
+    """
+
+    def __init__(self, bind_keys, check_seconds, retry_seconds):
+        self.bind_keys = bind_keys
+        self.check_seconds = check_seconds
+        self.retry_seconds = retry_seconds
+        self.order = cycle(bind_keys)
+        self.checked_at = {}
+        self.down_until = {}
+        self.lock = Lock()
+
+    def choose(self, db, app):
+        for _ in self.bind_keys:
+            with self.lock:
+                bind_key = next(self.order)
+            now = monotonic()
+            if self.down_until.get(bind_key, 0) > now:
+                continue
+            engine = db.get_engine(app, bind=bind_key)
+            if now - self.checked_at.get(bind_key, float('-inf')) < self.check_seconds:
+                return engine
+            try:
+                engine.connect().close()
+            except SQLAlchemyError as e:
+                self.down_until[bind_key] = now + self.retry_seconds
+                app.logger.warning(f"replica {bind_key} is unavailable, reading from the primary: {e}")
+                continue
+            self.checked_at[bind_key] = now
+            return engine
+        return None
+
+
+class RoutingSession(SignallingSession):
+    """Sends the reads of GET requests to a replica.
+
+    Everything else goes to the primary: writes, flushes, models with a
+    __bind_key__, and every read after this session has written anything,
+    so a handler always reads its own writes. A session keeps the replica
+    it picked first, so its reads see one consistent copy.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.replica_bind(mapper, clause)
+        if replica is not None:
+            return replica
+        return super().get_bind(mapper, clause)
+
+    def replica_bind(self, mapper, clause):
+        replicas = self.app.extensions.get('replicas')
+        if replicas is None or self.info.get('wrote'):
+            return None
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info['wrote'] = True
+            return None
+        if not has_request_context() or request.method not in READ_METHODS:
+            return None
+        if mapper is not None and mapper.persist_selectable.info.get('bind_key') is not None:
+            return None
+
+        if 'replica' not in self.info:
+            self.info['replica'] = replicas.choose(get_state(self.app).db, self.app)
+        return self.info['replica']
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def replica_bind_keys(app):
+    return [f'replica_{index}' for index in range(len(app.config.get('SQLALCHEMY_REPLICA_URIS') or ()))]
+
+
+def init_app(app):
+    """Register SQLALCHEMY_REPLICA_URIS as binds; call before db.init_app."""
+    bind_keys = replica_bind_keys(app)
+    if not bind_keys:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.update(zip(bind_keys, app.config['SQLALCHEMY_REPLICA_URIS']))
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['replicas'] = ReplicaSet(
+        bind_keys, app.config.get('REPLICA_CHECK_SECONDS', 5), app.config.get('REPLICA_RETRY_SECONDS', 30)
+    )
+
+    @app.teardown_request
+    def end_stickiness(exc):
+        # the session can outlive the request (an app context pushed around
+        # several requests), the routing decisions must not
+        info = get_state(app).db.session.info
+        info.pop('wrote', None)
+        info.pop('replica', None)
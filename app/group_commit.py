@@ -0,0 +1,143 @@
+from threading import Condition, Event, Lock, Thread
+from time import monotonic
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from app.models import db
+from data_structures.custom_queue import Queue
+
+
+class PendingInsert:
+    def __init__(self, model, values):
+        self.model = model
+        self.values = values
+        self.row = None
+        self.error = None
+        self.taken = False
+        self.cancelled = False
+        self.done = Event()
+
+
+class GroupCommitter:
+    """Inserts rows from concurrent requests in shared transactions.
+
+    Requests enqueue their row and block. A flusher thread, started on first
+    use, takes whatever is queued once GROUP_COMMIT_MAX_BATCH rows are
+    waiting or GROUP_COMMIT_WINDOW_MS after the oldest one arrived, inserts
+    the batch in one transaction and wakes each request with its committed
+    row, so one commit (and one fsync) is paid per batch instead of per
+    request. If the batch fails, its rows are retried one transaction each
+    so a bad row only fails its own request. A request that times out while
+    its row is still queued withdraws the row before answering 503.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.window = app.config.get('GROUP_COMMIT_WINDOW_MS', 5) / 1000
+        self.max_batch = app.config.get('GROUP_COMMIT_MAX_BATCH', 64)
+        self.timeout = app.config.get('GROUP_COMMIT_TIMEOUT', 10)
+        self.queue = Queue()
+        self.size = 0
+        self.condition = Condition()
+        self.flusher = None
+        self.lock = Lock()
+        self.batches = 0
+        self.rows = 0
+
+    def start_flusher(self):
+        if self.flusher is None:
+            with self.lock:
+                if self.flusher is None:
+                    self.flusher = Thread(target=self.run, name='group-commit', daemon=True)
+                    self.flusher.start()
+
+    def insert(self, model, **values):
+        """Insert one row through the next batch and return it, detached, once committed."""
+        self.start_flusher()
+        pending = PendingInsert(model, values)
+        with self.condition:
+            self.queue.enqueue(pending)
+            self.size += 1
+            self.condition.notify()
+
+        if not pending.done.wait(self.timeout):
+            with self.condition:
+                if not pending.taken:
+                    # still queued: withdraw it so the 503 means nothing was written
+                    pending.cancelled = True
+                    raise ServiceUnavailable("Timed out waiting for the group commit")
+            # already being flushed, its outcome is the answer
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.row
+
+    def next_batch(self):
+        with self.condition:
+            while not self.size:
+                self.condition.wait()
+            deadline = monotonic() + self.window
+            while self.size < self.max_batch and deadline > monotonic():
+                self.condition.wait(deadline - monotonic())
+            batch = [self.queue.dequeue().data for _ in range(min(self.size, self.max_batch))]
+            self.size -= len(batch)
+            batch = [pending for pending in batch if not pending.cancelled]
+            for pending in batch:
+                pending.taken = True
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if not batch:
+                continue
+            try:
+                self.flush(batch)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = pending.error or e
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+    def flush(self, batch):
+        with self.app.app_context():
+            # the rows are handed to other threads, so they must keep their
+            # loaded attributes after the commit
+            db.session().expire_on_commit = False
+            try:
+                rows = [pending.model(**pending.values) for pending in batch]
+                db.session.add_all(rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.warning(f"group commit of {len(batch)} rows failed, retrying them one by one")
+                rows = [self.flush_one(pending) for pending in batch]
+            finally:
+                db.session.remove()
+        for pending, row in zip(batch, rows):
+            pending.row = row
+        self.batches += 1
+        self.rows += len(batch)
+
+    @staticmethod
+    def flush_one(pending):
+        try:
+            row = pending.model(**pending.values)
+            db.session.add(row)
+            db.session.commit()
+            # keep a later rollback from expiring it
+            db.session.expunge(row)
+            return row
+        except Exception as e:
+            db.session.rollback()
+            pending.error = e
+            return None
+
+
+def get_group_committer():
+    return current_app.extensions.get('group_committer')
+
+
+def init_app(app):
+    if app.config.get('GROUP_COMMIT_ENABLED'):
+        app.extensions['group_committer'] = GroupCommitter(app)
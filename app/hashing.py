@@ -0,0 +1,105 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from itertools import repeat
+from math import ceil
+from threading import BoundedSemaphore, Lock
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class PasswordHasher:
+    """Runs password hashing off the request thread.
+
+    With PASSWORD_HASH_WORKERS > 0 the KDF runs in a process pool that is
+    started on first use. At most PASSWORD_HASH_MAX_PENDING hashes may be
+    queued or running at once; beyond that, or when a hash takes longer than
+    PASSWORD_HASH_TIMEOUT seconds, the request fails fast with a 503 instead
+    of tying up the worker.
+    """
+
+    def __init__(self, config):
+        self.method = config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+        self.salt_length = config.get('PASSWORD_HASH_SALT_LENGTH', 16)
+        self.workers = config.get('PASSWORD_HASH_WORKERS', 0)
+        self.timeout = config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self.pending = BoundedSemaphore(config.get('PASSWORD_HASH_MAX_PENDING', 64))
+        self.executor = None
+        self.lock = Lock()
+
+    @property
+    def method_prefix(self):
+        # werkzeug stores the iteration count even when the method omits it
+        if self.method.startswith('pbkdf2:') and self.method.count(':') == 1:
+            return f'{self.method}:{DEFAULT_PBKDF2_ITERATIONS}'
+        return self.method
+
+    def start_executor(self):
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        if not self.pending.acquire(blocking=False):
+            raise ServiceUnavailable("Too many pending password hash requests")
+        try:
+            future = self.start_executor().submit(fn, *args)
+        except Exception:
+            self.pending.release()
+            raise
+        future.add_done_callback(lambda _: self.pending.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise ServiceUnavailable("Password hashing timed out")
+
+    def generate_many(self, passwords):
+        # a whole batch holds a single pending slot and is spread across
+        # every pool worker
+        passwords = list(passwords)
+        if not self.workers or len(passwords) < 2:
+            return [self.generate(password) for password in passwords]
+
+        if not self.pending.acquire(blocking=False):
+            raise ServiceUnavailable("Too many pending password hash requests")
+        try:
+            chunksize = max(1, len(passwords) // (self.workers * 4))
+            hashes = self.start_executor().map(
+                generate_password_hash, passwords, repeat(self.method), repeat(self.salt_length),
+                timeout=self.timeout * ceil(len(passwords) / self.workers), chunksize=chunksize
+            )
+            return list(hashes)
+        except TimeoutError:
+            raise ServiceUnavailable("Password hashing timed out")
+        finally:
+            self.pending.release()
+
+    def generate(self, password):
+        return self.run(generate_password_hash, password, self.method, self.salt_length)
+
+    def check(self, pwhash, password):
+        return self.run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        method, _, rest = pwhash.partition('$')
+        salt = rest.partition('$')[0]
+        return method != self.method_prefix or len(salt) != self.salt_length
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+def get_password_hasher():
+    return current_app.extensions['password_hasher']
+
+
+def init_app(app):
+    app.extensions['password_hasher'] = PasswordHasher(app.config)
@@ -0,0 +1,181 @@
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from flask import Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CountingCursor:
+    """Delegates to a DBAPI cursor and counts the rows fetched through it."""
+
+    def __init__(self, cursor, counter):
+        self.cursor = cursor
+        self.counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        for row in self.cursor:
+            self.counter.rows_fetched += 1
+            yield row
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.counter.rows_fetched += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self.cursor.fetchmany(*args)
+        self.counter.rows_fetched += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        self.counter.rows_fetched += len(rows)
+        return rows
+
+
+class RequestCounter:
+    def __init__(self):
+        self.started = perf_counter()
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.rows_fetched = 0
+        self.exempt_statements = 0
+        self.exempt_rows = 0
+
+
+class EndpointStats:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requests = 0
+        self.seconds = 0.0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.rows_fetched = 0
+        self.response_bytes = 0
+
+
+class Metrics:
+    """Per-endpoint request metrics rendered in the Prometheus text format.
+
+    Each request only touches a few counters on flask.g plus one locked
+    update at the end, so the instrumentation is cheap enough to keep on.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = Lock()
+
+    def observe(self, endpoint, method, status, seconds, counter, response_bytes):
+        key = (endpoint, method, status)
+        with self.lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+            stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.requests += 1
+            stats.seconds += seconds
+            stats.sql_statements += counter.sql_statements
+            stats.sql_seconds += counter.sql_seconds
+            stats.rows_fetched += counter.rows_fetched
+            stats.response_bytes += response_bytes
+
+    def render(self, extra=()):
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = [
+                '# HELP flaskapi_request_duration_seconds Request latency.',
+                '# TYPE flaskapi_request_duration_seconds histogram'
+            ]
+            for (endpoint, method, status), stats in endpoints:
+                labels = f'endpoint="{endpoint}",method="{method}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                    cumulative += count
+                    lines.append(f'flaskapi_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'flaskapi_request_duration_seconds_sum{{{labels}}} {stats.seconds}')
+                lines.append(f'flaskapi_request_duration_seconds_count{{{labels}}} {stats.requests}')
+
+            for name, attribute, help_text in (
+                ('flaskapi_sql_statements_total', 'sql_statements', 'SQL statements executed.'),
+                ('flaskapi_sql_duration_seconds_total', 'sql_seconds', 'Time spent executing SQL.'),
+                ('flaskapi_rows_fetched_total', 'rows_fetched', 'Rows fetched from the database.'),
+                ('flaskapi_response_bytes_total', 'response_bytes', 'Response body bytes.')
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (endpoint, method, status), stats in endpoints:
+                    labels = f'endpoint="{endpoint}",method="{method}",status="{status}"'
+                    lines.append(f'{name}{{{labels}}} {getattr(stats, attribute)}')
+
+        for name, metric_type, help_text, value in extra:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def current_counter():
+    if has_app_context():
+        return g.get('request_counter')
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_counter() is not None:
+        context.metrics_started = perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = current_counter()
+    if counter is None or context is None or not hasattr(context, 'metrics_started'):
+        return
+    counter.sql_statements += 1
+    counter.sql_seconds += perf_counter() - context.metrics_started
+    if cursor.description is not None:
+        # the result is built from context.cursor after this hook returns
+        context.cursor = CountingCursor(cursor, counter)
+
+
+def start_request():
+    g.request_counter = RequestCounter()
+
+
+def finish_request(response):
+    counter = g.pop('request_counter', None)
+    if counter is None:
+        return response
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    response_bytes = 0 if response.is_streamed else (response.content_length or 0)
+    current_app.extensions['metrics'].observe(
+        endpoint, request.method, response.status_code, perf_counter() - counter.started, counter, response_bytes
+    )
+    return response
+
+
+def metrics_view():
+    post_index = current_app.extensions['post_index'].stats()
+    extra = [
+        ('flaskapi_post_index_hits_total', 'counter', 'Post index lookups served from memory.', post_index['hits']),
+        ('flaskapi_post_index_misses_total', 'counter', 'Post index lookups that fell back to the database.', post_index['misses']),
+        ('flaskapi_post_index_rebuilds_total', 'counter', 'Full post index loads.', post_index['rebuilds']),
+        ('flaskapi_post_index_size', 'gauge', 'Posts held in the post index.', post_index['size'])
+    ]
+    return Response(current_app.extensions['metrics'].render(extra), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    app.extensions['metrics'] = Metrics()
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,6 +1,10 @@
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from sqlalchemy import delete, desc, event, select, update
+from sqlalchemy.orm import validates
+from app.database import RoutingSQLAlchemy
+from app.numeric_body import numeric_body
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 
 # models
 class User(db.Model):
@@ -13,6 +17,10 @@ class User(db.Model):
     phone = db.Column(db.String(50))
     posts = db.relationship("BlogPost", cascade="all, delete", backref="parent")
 
+    __table_args__ = (
+        db.Index('ix_users_email', email, unique=True),
+    )
+
     @classmethod
     def get_by_id(cls, id):
         return cls.query.get_or_404(id)
@@ -22,9 +30,96 @@ class BlogPost(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String())
     body = db.Column(db.String())
+    numeric_body = db.Column(db.BigInteger)
     date = db.Column(db.Date)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_blog_posts_user_id_id', user_id, id.desc()),
+        db.Index('ix_blog_posts_date_id', date, id),
+        db.Index('ix_blog_posts_updated_at', updated_at),
+    )
+    # the ORM bumps version on every UPDATE and refuses to overwrite a row
+    # that another transaction changed in the meantime
+    __mapper_args__ = {'version_id_col': version}
+
+    @validates('body')
+    def update_numeric_body(self, key, body):
+        self.numeric_body = numeric_body(body)
+        return body
 
     @classmethod
     def get_by_user_id(cls, user_id):
-        return cls.query.get_or_404(user_id)
\ No newline at end of file
+        return cls.query.get_or_404(user_id)
+
+    @classmethod
+    def delete_latest(cls, count):
+        newest = select(cls.id).order_by(desc(cls.id)).limit(count)
+        result = db.session.execute(
+            delete(cls).where(cls.id.in_(newest)).execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            ChangeCounter.mark_changed(cls.__tablename__)
+        return result.rowcount
+
+class ChangeCounter(db.Model):
+    """One row per tracked table, bumped after every committed write to it,
+    so a listing's ETag can be checked without reading the listing.
+
+    The bump runs in a short transaction of its own once the write has
+    committed: writers never hold the counter row lock while their own
+    transaction is open, and a reader can at worst see the new rows under
+    the old ETag until the bump lands, never the old rows under the new one.
+    """
+    __tablename__ = 'change_counters'
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    tracked = ('users', 'blog_posts')
+
+    @classmethod
+    def bump_statement(cls, table_names):
+        return update(cls.__table__).where(cls.__table__.c.table_name.in_(sorted(table_names))).\
+            values(version=cls.__table__.c.version + 1, updated_at=datetime.utcnow())
+
+    @staticmethod
+    def mark_changed(*table_names):
+        # for writes that skip the flush (bulk inserts, Core statements)
+        db.session().info.setdefault('changed_tables', set()).update(table_names)
+
+    @classmethod
+    def read_statement(cls, table_names):
+        return select(cls.table_name, cls.version, cls.updated_at).where(cls.table_name.in_(table_names))
+
+    @classmethod
+    def read(cls, *table_names):
+        return {row.table_name: row for row in db.session.execute(cls.read_statement(table_names))}
+
+@event.listens_for(ChangeCounter.__table__, 'after_create')
+def seed_change_counters(table, connection, **kw):
+    now = datetime.utcnow()
+    connection.execute(table.insert(), [
+        {'table_name': name, 'version': 0, 'updated_at': now} for name in ChangeCounter.tracked
+    ])
+
+@event.listens_for(db.session, 'before_flush')
+def mark_changed_tables(session, flush_context, instances):
+    changed = {obj.__tablename__ for obj in session.new} | {obj.__tablename__ for obj in session.deleted}
+    changed.update(obj.__tablename__ for obj in session.dirty if session.is_modified(obj))
+    changed.intersection_update(ChangeCounter.tracked)
+    if changed:
+        session.info.setdefault('changed_tables', set()).update(changed)
+
+@event.listens_for(db.session, 'after_commit')
+def bump_change_counters(session):
+    changed = session.info.pop('changed_tables', None)
+    if changed:
+        with db.engine.begin() as connection:
+            connection.execute(ChangeCounter.bump_statement(changed))
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_changed_tables(session):
+    session.info.pop('changed_tables', None)
@@ -0,0 +1,88 @@
+import click
+from flask.cli import AppGroup
+
+
+def numeric_body(body):
+    """Sum of the code points of a post body, as served by /blog_posts/numeric_body."""
+    if body is None:
+        return None
+    return sum(map(ord, body))
+
+
+def numeric_bodies(bodies):
+    """Compute numeric_body for many bodies at once.
+
+    All bodies are encoded into one UTF-32 buffer so every code point is a
+    single uint32, and the per-body sums are read off a running total at
+    each body boundary.
+    """
+    # imported here: models use numeric_body, and workers never need numpy
+    import numpy as np
+
+    bodies = list(bodies)
+    if not bodies:
+        return []
+
+    buffers = [body.encode('utf-32-le') if body is not None else b'' for body in bodies]
+    codes = np.frombuffer(b''.join(buffers), dtype='<u4')
+    ends = np.cumsum([len(buffer) // 4 for buffer in buffers], dtype=np.int64)
+    totals = np.concatenate(([0], np.cumsum(codes, dtype=np.int64)))
+    starts = np.concatenate(([0], ends[:-1]))
+    sums = (totals[ends] - totals[starts]).tolist()
+    return [None if body is None else total for body, total in zip(bodies, sums)]
+
+
+def recompute_numeric_bodies(connection, table, batch_size=1000, fix=True):
+    """Walk a blog_posts table in id order and (re)compute numeric_body.
+
+    Returns the number of rows whose stored value was missing or wrong;
+    with fix=False the rows are only counted, which makes this usable as a
+    verification pass.
+    """
+    import sqlalchemy as sa
+
+    mismatched = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.body, table.c.numeric_body)
+            .where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return mismatched
+        last_id = rows[-1].id
+
+        updates = [
+            {'post_id': row.id, 'value': value}
+            for row, value in zip(rows, numeric_bodies(row.body for row in rows))
+            if row.numeric_body != value
+        ]
+        mismatched += len(updates)
+        if fix and updates:
+            connection.execute(
+                table.update().where(table.c.id == sa.bindparam('post_id')).values(numeric_body=sa.bindparam('value')),
+                updates
+            )
+
+
+numeric_body_cli = AppGroup('numeric-body', help="Maintain the blog_posts.numeric_body column.")
+
+
+@numeric_body_cli.command('verify')
+@click.option('--batch-size', default=1000)
+def verify_command(batch_size):
+    """Count posts whose stored numeric_body is missing or stale."""
+    from app.models import BlogPost, db
+    with db.engine.connect() as connection:
+        mismatched = recompute_numeric_bodies(connection, BlogPost.__table__, batch_size, fix=False)
+    click.echo(f'{mismatched} posts need a recompute')
+
+
+@numeric_body_cli.command('backfill')
+@click.option('--batch-size', default=1000)
+def backfill_command(batch_size):
+    """Recompute numeric_body wherever it is missing or stale."""
+    from app.models import BlogPost, db
+    with db.engine.begin() as connection:
+        fixed = recompute_numeric_bodies(connection, BlogPost.__table__, batch_size)
+    click.echo(f'{fixed} posts updated')
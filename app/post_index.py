@@ -0,0 +1,244 @@
+from datetime import datetime, timedelta
+from itertools import chain, islice
+from threading import RLock
+from flask import current_app, has_app_context
+from sqlalchemy import event, or_
+from app.models import BlogPost, db
+from app.query_budget import budget_exempt
+from data_structures import binary_search_tree, search_index
+
+
+def date_key(post):
+    # posts created in this worker still carry the datetime they were given
+    return (post.date.date() if isinstance(post.date, datetime) else post.date, post.id)
+
+
+class IndexEntry:
+    __slots__ = ('id', 'version', 'date')
+
+    def __init__(self, id, version, date):
+        self.id = id
+        self.version = version
+        self.date = date
+
+
+class PostIndex:
+    """In-process index of the posts' ids, dates and titles, shared by every
+    request of a worker.
+
+    Bodies are not held: an id TreeMap maps each post to an IndexEntry
+    (version, date), a second TreeMap keyed by (date, id) serves the date
+    range listing, and a trigram index over the titles the bulkFetch search.
+    Served posts are always read from the table by primary key, which also
+    refreshes or drops the entries other workers changed or deleted. The
+    index is loaded by the first search, then kept current by the write
+    handlers and, for other workers' writes, by catch_up(); a rolled back
+    transaction drops the posts it had flushed.
+    """
+
+    entry_columns = (BlogPost.id, BlogPost.title, BlogPost.version, BlogPost.date, BlogPost.updated_at)
+    columns = (BlogPost.id, BlogPost.title, BlogPost.body, BlogPost.date, BlogPost.user_id,
+               BlogPost.version, BlogPost.updated_at)
+
+    def __init__(self, change_window=10):
+        self.treemap = None
+        self.titles = None
+        self.dates = None
+        self.max_id = 0
+        self.changed_since = datetime.min
+        self.change_window = timedelta(seconds=change_window)
+        self.lock = RLock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def rebuild(self):
+        with budget_exempt():
+            rows = db.session.query(*self.entry_columns).order_by(BlogPost.id).all()
+        entries = [IndexEntry(row.id, row.version, row.date) for row in rows]
+        treemap = binary_search_tree.TreeMap.from_sorted((entry.id, entry) for entry in entries)
+        dates = binary_search_tree.TreeMap.from_sorted(sorted(
+            (date_key(entry), entry) for entry in entries if entry.date is not None
+        ))
+        titles = search_index.SearchIndex()
+        for row in rows:
+            titles.add(row.id, row.title)
+        with self.lock:
+            self.treemap = treemap
+            self.titles = titles
+            self.dates = dates
+            self.max_id = rows[-1].id if rows else 0
+            self.changed_since = max((row.updated_at for row in rows if row.updated_at), default=datetime.min)
+            self.rebuilds += 1
+        return treemap, titles, dates
+
+    def loaded(self):
+        # the references are read under the lock, a concurrent invalidate()
+        # may clear them at any time
+        with self.lock:
+            if self.treemap is not None:
+                return self.treemap, self.titles, self.dates
+        return self.rebuild()
+
+    def invalidate(self):
+        with self.lock:
+            self.treemap = None
+            self.titles = None
+            self.dates = None
+
+    def entry(self, post_id):
+        with self.lock:
+            return self.treemap[post_id] if self.treemap is not None else None
+
+    def get(self, post_id):
+        """The post's row, read by primary key, or None; its entry is refreshed on the way."""
+        row = db.session.query(*self.columns).filter(BlogPost.id == post_id).first()
+        entry = self.entry(post_id)
+        if row is not None and entry is not None and entry.version == row.version:
+            self.hits += 1
+            return row
+        self.misses += 1
+        if row is None:
+            self.discard(post_id)
+        else:
+            self.put(row)
+        return row
+
+    def rows(self, entries):
+        # read the page by primary key, dropping the posts deleted by other
+        # workers and refreshing the entries of the ones they changed
+        if not entries:
+            return []
+        found = {row.id: row for row in db.session.query(*self.columns)
+                 .filter(BlogPost.id.in_([entry.id for entry in entries]))}
+        for entry in entries:
+            row = found.get(entry.id)
+            if row is None:
+                self.discard(entry.id)
+            elif row.version != entry.version:
+                self.put(row)
+        return [found[entry.id] for entry in entries if entry.id in found]
+
+    def catch_up(self):
+        # pick up the posts other workers created or changed since the last
+        # look. updated_at is set at flush and an older transaction can
+        # commit after a newer one, so the last change_window (config
+        # POST_INDEX_CHANGE_WINDOW) seconds are read again every time.
+        # Deletes are not seen here; callers check candidates against the table.
+        since = max(self.changed_since, datetime.min + self.change_window) - self.change_window
+        rows = db.session.query(*self.entry_columns).filter(
+            or_(BlogPost.id > self.max_id, BlogPost.updated_at > since)
+        ).order_by(BlogPost.id).all()
+        for row in rows:
+            entry = self.entry(row.id)
+            if entry is None or entry.version != row.version:
+                self.put(row)
+            if row.updated_at is not None and row.updated_at > self.changed_since:
+                self.changed_since = row.updated_at
+
+    def search(self, text):
+        _, titles, _ = self.loaded()
+        self.catch_up()
+
+        with self.lock:
+            return titles.search(text)
+
+    def page(self, treemap_name, lo, hi, limit):
+        # a cold index is not loaded for a single page; the caller runs the
+        # matching indexed query instead
+        with self.lock:
+            if self.treemap is None:
+                return None
+        self.catch_up()
+        while True:
+            with self.lock:
+                treemap = getattr(self, treemap_name)
+                if treemap is None:
+                    return None
+                entries = [entry for _, entry in islice(treemap.range(lo, hi), limit)]
+            rows = self.rows(entries)
+            # the deleted posts are gone from the index now, so read the page again
+            if len(rows) == len(entries):
+                return rows
+
+    def id_range(self, lo, hi, limit):
+        """Up to limit posts with lo <= id < hi in id order, or None when the index is not loaded."""
+        return self.page('treemap', lo, hi, limit)
+
+    def date_range(self, lo, hi, limit):
+        """Up to limit posts with lo <= (date, id) < hi in that order, or None when the index is not loaded."""
+        return self.page('dates', lo, hi, limit)
+
+    def put(self, post):
+        with self.lock:
+            if self.treemap is not None:
+                self.discard_date(post.id)
+                entry = IndexEntry(post.id, post.version, post.date)
+                self.treemap[post.id] = entry
+                if entry.date is not None:
+                    self.dates[date_key(entry)] = entry
+                self.titles.add(post.id, post.title)
+                self.max_id = max(self.max_id, post.id)
+
+    def discard_date(self, post_id):
+        previous = self.treemap[post_id]
+        if previous is not None and previous.date is not None:
+            self.dates.remove(date_key(previous))
+
+    def discard(self, post_id):
+        with self.lock:
+            if self.treemap is not None:
+                self.discard_date(post_id)
+                self.treemap.remove(post_id)
+                self.titles.remove(post_id)
+
+    def discard_above(self, post_id):
+        with self.lock:
+            if self.treemap is None:
+                return
+            while self.treemap.root is not None:
+                node = self.treemap.root
+                while node.right is not None:
+                    node = node.right
+                if node.key <= post_id:
+                    break
+                self.discard_date(node.key)
+                self.treemap.remove(node.key)
+                self.titles.remove(node.key)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'rebuilds': self.rebuilds,
+            'size': len(self.treemap) if self.treemap is not None else 0
+        }
+
+
+def get_post_index():
+    return current_app.extensions['post_index']
+
+
+def init_app(app):
+    app.extensions['post_index'] = PostIndex(app.config.get('POST_INDEX_CHANGE_WINDOW', 10))
+
+
+@event.listens_for(db.session, 'after_flush')
+def remember_flushed_posts(session, flush_context):
+    posts = [obj for obj in chain(session.new, session.dirty, session.deleted) if isinstance(obj, BlogPost)]
+    if posts:
+        session.info.setdefault('post_ids', set()).update(post.id for post in posts)
+
+
+@event.listens_for(db.session, 'after_commit')
+def forget_flushed_posts(session):
+    session.info.pop('post_ids', None)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_on_rollback(session):
+    post_ids = session.info.pop('post_ids', None)
+    if post_ids and has_app_context() and 'post_index' in current_app.extensions:
+        post_index = current_app.extensions['post_index']
+        for post_id in post_ids:
+            post_index.discard(post_id)
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g
+from app.metrics import RequestCounter, current_counter
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_statements=None, max_rows=None):
+    """Cap the SQL statements and rows a handler may use.
+
+    Counting includes anything the handler triggers while its response is
+    marshalled, such as lazy relationship loads, so the decorator belongs
+    above marshal_with. Over budget, it raises QueryBudgetExceeded when
+    QUERY_BUDGET_RAISE is set (TestConfig) and logs a warning otherwise.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            counter = current_counter()
+            if counter is None:
+                counter = g.request_counter = RequestCounter()
+            statements = counter.sql_statements - counter.exempt_statements
+            rows = counter.rows_fetched - counter.exempt_rows
+
+            result = f(*args, **kwargs)
+
+            statements = counter.sql_statements - counter.exempt_statements - statements
+            rows = counter.rows_fetched - counter.exempt_rows - rows
+            if (max_statements is not None and statements > max_statements) or (max_rows is not None and rows > max_rows):
+                message = (f"{f.__qualname__} used {statements} SQL statements (budget {max_statements}) "
+                           f"and fetched {rows} rows (budget {max_rows})")
+                if current_app.config.get('QUERY_BUDGET_RAISE'):
+                    raise QueryBudgetExceeded(message)
+                current_app.logger.warning(message)
+            return result
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def budget_exempt():
+    """Leave out the queries run inside the block, e.g. a one-off cache load."""
+    counter = current_counter()
+    if counter is None:
+        yield
+        return
+    statements, rows = counter.sql_statements, counter.rows_fetched
+    try:
+        yield
+    finally:
+        counter.exempt_statements += counter.sql_statements - statements
+        counter.exempt_rows += counter.rows_fetched - rows
@@ -1,9 +1,11 @@
 from flask_restx import Namespace, Resource, fields
-from app.models import User
+from app.models import User, db
+from app.hashing import get_password_hasher
+from app.user_cache import token_claims
+from app.query_budget import query_budget
 from http import HTTPStatus
 from flask import request
-from werkzeug.security import check_password_hash
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, current_user
 from werkzeug.exceptions import BadRequest
 
 auth_namespace = Namespace('Auth', description="Namespace for authentication", path='/')
@@ -18,6 +20,7 @@ login_model = auth_namespace.model(
 @auth_namespace.route('/auth/login')
 class Login(Resource):
 
+    @query_budget(max_statements=4, max_rows=2)
     @auth_namespace.expect(login_model)
     def post(self):
         """Generate a bearer token"""
@@ -26,10 +29,16 @@ class Login(Resource):
         email = data.get('email')
         password = data.get('password')
         user = User.query.filter_by(email=email).first()
+        hasher = get_password_hasher()
 
-        if (user is not None) and check_password_hash(user.password_hash, password):
-            access_token = create_access_token(identity=user.email)
-            refresh_token = create_refresh_token(identity=user.email)
+        if (user is not None) and hasher.check(user.password_hash, password):
+            if hasher.needs_rehash(user.password_hash):
+                user.password_hash = hasher.generate(password)
+                db.session.commit()
+
+            claims = token_claims(user.id)
+            access_token = create_access_token(identity=user.email, additional_claims=claims)
+            refresh_token = create_refresh_token(identity=user.email, additional_claims=claims)
 
             response = {
                 'access_token': access_token,
@@ -48,6 +57,6 @@ class Refresh(Resource):
     def post(self):
         email = get_jwt_identity()
 
-        access_token = create_access_token(identity=email)
+        access_token = create_access_token(identity=email, additional_claims=token_claims(current_user.id))
 
         return {'access_token': access_token}, HTTPStatus.OK
\ No newline at end of file
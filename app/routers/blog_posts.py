@@ -1,33 +1,162 @@
-from flask_restx import Namespace, Resource, fields, reqparse, marshal
-from flask import request
+from flask_restx import Namespace, Resource, fields, inputs, reqparse
+from flask import request, current_app
+from app.conditional import conditional, table_validators
+from app.group_commit import get_group_committer
 from app.models import User, BlogPost, db
-from datetime import datetime
-from data_structures import binary_search_tree, custom_queue, hash_table, stack
+from app.post_index import date_key, get_post_index
+from app.query_budget import query_budget
+from app.serializer import NestedFields, serialize_with
+from app.user_cache import get_user_cache
+from datetime import date, datetime, timedelta
+from data_structures import hash_table
 from http import HTTPStatus
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask_restx.fields import Nested
-from sqlalchemy import desc
-
-class NestedFields(Nested):
-
-    def __init__(self, model, **kwargs):
-        super().__init__(model=model, **kwargs)
-
-    def output(self, key, obj, ordered=False):
-        if obj is None:
-            if self.allow_null:
-                return None
-            elif self.default is not None:
-                return self.default
-
-        # directly marshal with obj instead of obj.key or obj.attribute
-        return marshal(obj, self.nested, skip_none=self.skip_none, ordered=ordered)
+from flask_jwt_extended import jwt_required, current_user
+from sqlalchemy import and_, desc, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from werkzeug.exceptions import BadRequest, Conflict
+
+def encode_cursor(post_id):
+    return urlsafe_b64encode(f'post_id:{post_id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        prefix, post_id = urlsafe_b64decode(cursor.encode()).decode().split(':')
+        if prefix != 'post_id':
+            raise ValueError(cursor)
+        return int(post_id)
+    except ValueError:
+        raise BadRequest("Invalid cursor")
+
+def parse_post_ids(raw_ids):
+    # ids=1,2,3, repeated ids=1&ids=2, or a JSON list
+    try:
+        post_ids = [int(post_id) for value in raw_ids for post_id in str(value).split(',') if str(post_id).strip()]
+    except ValueError:
+        raise BadRequest("ids must be integers")
+    if not post_ids:
+        raise BadRequest("ids is required")
+    max_ids = current_app.config.get('BATCH_MAX_IDS', 500)
+    if len(post_ids) > max_ids:
+        raise BadRequest(f"At most {max_ids} ids per request")
+    return post_ids
+
+def post_columns():
+    return select(BlogPost.id, BlogPost.title, BlogPost.body, BlogPost.date, BlogPost.user_id)
+
+def fetch_batch(post_ids):
+    rows = db.session.execute(
+        post_columns().where(BlogPost.id.in_(set(post_ids)))
+    ).all()
+    found = {row.id: row for row in rows}
+    missing = [post_id for post_id in dict.fromkeys(post_ids) if post_id not in found]
+    return {"posts": [found[post_id] for post_id in post_ids if post_id in found], "missing": missing}
+
+def encode_date_cursor(post_date, post_id):
+    return urlsafe_b64encode(f'date:{post_date.isoformat()}:{post_id}'.encode()).decode()
+
+def decode_date_cursor(cursor):
+    try:
+        prefix, post_date, post_id = urlsafe_b64decode(cursor.encode()).decode().split(':')
+        if prefix != 'date':
+            raise ValueError(cursor)
+        return date.fromisoformat(post_date), int(post_id)
+    except ValueError:
+        raise BadRequest("Invalid cursor")
+
+def range_limit(limit):
+    max_limit = current_app.config.get('RANGE_MAX_LIMIT', 1000)
+    if not 0 < limit <= max_limit:
+        raise BadRequest(f"limit must be between 1 and {max_limit}")
+    return limit
+
+def search_limit(limit, config=None):
+    # the title index's matches become bind parameters of the page query, so
+    # a search is paged at SEARCH_MAX_LIMIT even when no Limit is given
+    max_limit = (config or current_app.config).get('SEARCH_MAX_LIMIT', 1000)
+    return min(int(limit), max_limit) if limit else max_limit
+
+def id_range_statement(lo, hi, limit):
+    # the same page as PostIndex.id_range, off the primary key
+    query = post_columns()
+    if lo is not None:
+        query = query.where(BlogPost.id >= lo)
+    if hi is not None:
+        query = query.where(BlogPost.id < hi)
+    return query.order_by(BlogPost.id).limit(limit)
+
+def date_range_statement(lo, hi, limit):
+    # the same page as PostIndex.date_range, off ix_blog_posts_date (date, id)
+    query = post_columns().where(BlogPost.date.isnot(None))
+    if lo is not None:
+        lo_date, lo_id = lo
+        query = query.where(or_(BlogPost.date > lo_date, and_(BlogPost.date == lo_date, BlogPost.id >= lo_id)))
+    if hi is not None:
+        query = query.where(BlogPost.date < hi[0])
+    return query.order_by(BlogPost.date, BlogPost.id).limit(limit)
+
+def range_page(posts, limit, cursor):
+    # one extra row tells whether there is a next page
+    headers = {}
+    if len(posts) > limit:
+        posts = posts[:limit]
+        headers['Next-Cursor'] = cursor(posts[-1])
+    return posts, HTTPStatus.OK, headers
+
+def bulk_fetch_validators():
+    args = parser.parse_args()
+    return table_validators(('blog_posts', 'users'), args['Limit'], args['Search'], args['Cursor'])
+
+def find_post(blog_post_id):
+    # the conditional check and the handler share one lookup per request
+    if 'flaskapi.blog_post' not in request.environ:
+        request.environ['flaskapi.blog_post'] = get_post_index().get(blog_post_id)
+    return request.environ['flaskapi.blog_post']
+
+def version_validators(post):
+    if post is None or post.version is None:
+        return None
+    return f'post.{post.id}.{post.version}', post.updated_at
+
+def post_validators(blog_post_id):
+    return version_validators(find_post(blog_post_id))
+
+def search_page(post_ids, limit, search, cursor):
+    # the title index may still list posts other workers renamed or deleted,
+    # so its ids are read in growing chunks, newest first, until the page is full
+    if cursor is not None:
+        post_ids = [post_id for post_id in post_ids if post_id < cursor]
+    max_chunk = current_app.config.get('SEARCH_MAX_LIMIT', 1000)
+    rows, start, chunk = [], 0, limit
+    while len(rows) < limit and start < len(post_ids):
+        candidates = post_ids[start:start + chunk]
+        start += len(candidates)
+        rows += db.session.execute(bulk_fetch_statement(limit - len(rows), search, None, candidates)).all()
+        chunk = min(chunk * 2, max_chunk)
+    return rows
+
+def bulk_fetch_statement(limit, search, cursor, post_ids=None):
+    query = select(
+        BlogPost.id.label('post_id'), BlogPost.title, BlogPost.body, BlogPost.date,
+        User.id, User.name, User.email, User.address, User.phone
+    ).join(User, User.id == BlogPost.user_id)
+
+    if post_ids is not None:
+        # candidates from the title index; the LIKE below still decides
+        query = query.where(BlogPost.id.in_(post_ids))
+    if search:
+        query = query.where(BlogPost.title.contains(search))
+    if cursor is not None:
+        query = query.where(BlogPost.id < cursor)
+    return query.order_by(desc(BlogPost.id)).limit(int(limit) if limit else None)
 
 blogpost_namespace = Namespace('Blog Post', description="Namespace for Blog Post", path="/")
 
 parser = reqparse.RequestParser()
 parser.add_argument('Limit', type=str, help='limit', location='headers')
 parser.add_argument('Search', type=str, help='search', location='headers')
+parser.add_argument('Cursor', type=str, help='next_cursor of the previous page', location=('headers', 'args'))
 
 new_parser = reqparse.RequestParser()
 new_parser.add_argument('Limit', type=str, help='limit', location='headers')
@@ -60,6 +189,34 @@ blogpost_model = blogpost_namespace.model(
     }
 )
 
+blogpost_batch_model = blogpost_namespace.model(
+    'BlogPostBatch', {
+        'posts': fields.List(fields.Nested(blogpost_model, skip_none=True), description="Found posts, in the requested order"),
+        'missing': fields.List(fields.Integer, description="Requested ids that do not exist")
+    }
+)
+
+batch_ids_model = blogpost_namespace.model(
+    'BlogPostIds', {
+        'ids': fields.List(fields.Integer, required=True, description="Post ids")
+    }
+)
+
+batch_parser = reqparse.RequestParser()
+batch_parser.add_argument('ids', type=str, required=True, action='append', help='comma separated post ids', location='args')
+
+id_range_parser = reqparse.RequestParser()
+id_range_parser.add_argument('start', type=int, help='first id (inclusive)', location='args')
+id_range_parser.add_argument('end', type=int, help='end id (exclusive)', location='args')
+id_range_parser.add_argument('limit', type=int, default=100, help='page size', location='args')
+id_range_parser.add_argument('Cursor', type=str, help='Next-Cursor of the previous page', location=('headers', 'args'))
+
+date_range_parser = reqparse.RequestParser()
+date_range_parser.add_argument('start', type=inputs.date_from_iso8601, help='first date, YYYY-MM-DD (inclusive)', location='args')
+date_range_parser.add_argument('end', type=inputs.date_from_iso8601, help='last date, YYYY-MM-DD (inclusive)', location='args')
+date_range_parser.add_argument('limit', type=int, default=100, help='page size', location='args')
+date_range_parser.add_argument('Cursor', type=str, help='Next-Cursor of the previous page', location=('headers', 'args'))
+
 blogpost_detailed_model = blogpost_namespace.model(
     'BlogPost', {
         'post_id': fields.Integer(),
@@ -73,22 +230,93 @@ blogpost_detailed_model = blogpost_namespace.model(
 @blogpost_namespace.route('/blog_posts/bulkFetch')
 class GetBlogPost(Resource):
 
+    @query_budget(max_statements=5)
     @blogpost_namespace.expect(parser)
-    @blogpost_namespace.marshal_with(blogpost_detailed_model)
     @jwt_required()
+    @conditional(bulk_fetch_validators, vary=('Limit', 'Search', 'Cursor'))
+    @serialize_with(blogpost_namespace, blogpost_detailed_model)
     def get(self):
-        """Get all blog posts"""
+        """Get all blog posts (pass the Next-Cursor response header back as Cursor for the next page)"""
         args = parser.parse_args()
         limit = args['Limit']
         search = args['Search']
-        if not search:
-            search = ''
-
-        blog_posts = BlogPost.query.join(User, User.id == BlogPost.user_id).\
-            add_columns(BlogPost.id.label('post_id'), BlogPost.title, BlogPost.body, BlogPost.date, User.id, User.name, User.email, User.address, User.phone).\
-            filter(BlogPost.title.contains(search)).order_by(desc(BlogPost.id)).limit(limit).all()
+        cursor = decode_cursor(args['Cursor']) if args['Cursor'] else None
+        if search:
+            limit = search_limit(limit)
+
+        post_ids = get_post_index().search(search) if search else None
+        if post_ids is not None:
+            blog_posts = search_page(post_ids, limit, search, cursor)
+        else:
+            blog_posts = db.session.execute(bulk_fetch_statement(limit, search, cursor)).all()
+
+        headers = {}
+        if limit and blog_posts and len(blog_posts) == int(limit):
+            headers['Next-Cursor'] = encode_cursor(blog_posts[-1].post_id)
+        return blog_posts, HTTPStatus.OK, headers
+
+@blogpost_namespace.route('/blog_posts/batch')
+class GetBlogPostBatch(Resource):
+
+    @query_budget(max_statements=2)
+    @blogpost_namespace.expect(batch_parser)
+    @serialize_with(blogpost_namespace, blogpost_batch_model)
+    @jwt_required()
+    def get(self):
+        """Get many blog posts by id with one query (ids=1,2,3)"""
+        return fetch_batch(parse_post_ids(batch_parser.parse_args()['ids'])), HTTPStatus.OK
 
-        return blog_posts
+    @query_budget(max_statements=2)
+    @blogpost_namespace.expect(batch_ids_model)
+    @serialize_with(blogpost_namespace, blogpost_batch_model)
+    @jwt_required()
+    def post(self):
+        """Get many blog posts by id with one query, for id lists too long for a URL"""
+        post_ids = (request.get_json(silent=True) or {}).get('ids')
+        if not isinstance(post_ids, list):
+            raise BadRequest("ids must be a list")
+        return fetch_batch(parse_post_ids(post_ids)), HTTPStatus.OK
+
+@blogpost_namespace.route('/blog_posts/range/ids')
+class GetBlogPostIdRange(Resource):
+
+    @query_budget(max_statements=4)
+    @blogpost_namespace.expect(id_range_parser)
+    @serialize_with(blogpost_namespace, blogpost_model, skip_none=True)
+    @jwt_required()
+    def get(self):
+        """Get blog posts with start <= id < end in id order (pass Next-Cursor back as Cursor for the next page)"""
+        args = id_range_parser.parse_args()
+        limit = range_limit(args['limit'])
+        lo = decode_cursor(args['Cursor']) + 1 if args['Cursor'] else args['start']
+
+        posts = get_post_index().id_range(lo, args['end'], limit + 1)
+        if posts is None:
+            posts = db.session.execute(id_range_statement(lo, args['end'], limit + 1)).all()
+        return range_page(posts, limit, lambda post: encode_cursor(post.id))
+
+@blogpost_namespace.route('/blog_posts/range/dates')
+class GetBlogPostDateRange(Resource):
+
+    @query_budget(max_statements=4)
+    @blogpost_namespace.expect(date_range_parser)
+    @serialize_with(blogpost_namespace, blogpost_model, skip_none=True)
+    @jwt_required()
+    def get(self):
+        """Get blog posts dated start..end in (date, id) order (pass Next-Cursor back as Cursor for the next page)"""
+        args = date_range_parser.parse_args()
+        limit = range_limit(args['limit'])
+        if args['Cursor']:
+            cursor_date, cursor_id = decode_date_cursor(args['Cursor'])
+            lo = (cursor_date, cursor_id + 1)
+        else:
+            lo = (args['start'], 0) if args['start'] else None
+        hi = (args['end'] + timedelta(days=1),) if args['end'] else None
+
+        posts = get_post_index().date_range(lo, hi, limit + 1)
+        if posts is None:
+            posts = db.session.execute(date_range_statement(lo, hi, limit + 1)).all()
+        return range_page(posts, limit, lambda post: encode_date_cursor(*date_key(post)))
 
 @blogpost_namespace.route('/blog_posts/bulkRemove', endpoint='blog_posts')
 class DeleteBlogPost(Resource):
@@ -98,48 +326,43 @@ class DeleteBlogPost(Resource):
     def delete(self):
         """Delete last 'N' blog posts (By default, delete last 10 blog posts)."""
         args = new_parser.parse_args()
-        limit = int(args['Limit'])
-        if not limit:
-            limit = int(10)
-
-        blog_posts = BlogPost.query.all()
-
-        s = stack.Stack()
-        for post in blog_posts:
-            s.push(post)
-
-        for _ in range(limit):
-            post_to_delete = s.pop()
-            print(post_to_delete.data)
-            db.session.delete(post_to_delete.data)
+        limit = int(args['Limit'] or 10)
+
+        # one set-based DELETE per chunk; without a chunk size the whole
+        # request is a single statement in a single transaction
+        chunk_size = current_app.config.get('BULK_DELETE_CHUNK_SIZE') or limit
+        deleted = 0
+        while deleted < limit:
+            rowcount = BlogPost.delete_latest(min(chunk_size, limit - deleted))
             db.session.commit()
+            deleted += rowcount
+            if not rowcount:
+                break
 
-        return {"message": f"Last {limit} blog post deleted"}, HTTPStatus.OK
+        get_post_index().discard_above(BlogPost.query.with_entities(func.max(BlogPost.id)).scalar() or 0)
+        return {"message": f"Last {deleted} blog post deleted", "deleted": deleted}, HTTPStatus.OK
 
 @blogpost_namespace.route('/blog_posts/users/')
 class GetCreateBlogPost(Resource):
 
-    @blogpost_namespace.marshal_with(blogpost_model, skip_none=True)
+    @query_budget(max_statements=2, max_rows=2)
+    @serialize_with(blogpost_namespace, blogpost_model, skip_none=True)
     @jwt_required()
     def get(self):
         """Get user specific blog posts"""
-        email = get_jwt_identity()
-        current_user = User.query.filter_by(email=email).first()
         blog_posts = BlogPost.query.filter_by(user_id=current_user.id).first()
 
         if not blog_posts:
             return {"message": "Blog Post not found"}, HTTPStatus.NOT_FOUND
         return blog_posts, HTTPStatus.OK
 
+    @query_budget(max_statements=4, max_rows=2)
     @blogpost_namespace.expect(new_blogpost_model)
     @blogpost_namespace.marshal_with(blogpost_model, skip_none=True)
     @jwt_required()
     def post(self):
         """Post a blog post"""
         data = request.get_json()
-        email = get_jwt_identity()
-        current_user = User.query.filter_by(email=email).first()
-
         if not current_user:
             return {'message': "User doesn't exist"}
 
@@ -149,35 +372,46 @@ class GetCreateBlogPost(Resource):
         ht.add_key_value("date", datetime.now())
         ht.add_key_value("user_id", current_user.id)
 
-        new_blog_post = BlogPost(
+        values = dict(
             title=ht.get_value("title"),
             body=ht.get_value("body"),
             date=ht.get_value("date"),
             user_id=ht.get_value("user_id")
         )
 
-        db.session.add(new_blog_post)
-        db.session.commit()
+        group_committer = get_group_committer()
+        try:
+            if group_committer is not None:
+                new_blog_post = group_committer.insert(BlogPost, **values)
+            else:
+                new_blog_post = BlogPost(**values)
+                db.session.add(new_blog_post)
+                db.session.commit()
+        except IntegrityError:
+            # the user was deleted through another worker while this one
+            # still had it cached
+            db.session.rollback()
+            get_user_cache().pop(current_user.id)
+            return {'message': "User doesn't exist"}, HTTPStatus.UNAUTHORIZED
+        get_post_index().put(new_blog_post)
         return new_blog_post, HTTPStatus.CREATED
 
 @blogpost_namespace.route('/blog_posts/<int:blog_post_id>')
 class GetUpdateDeleteOneBlogPost(Resource):
 
-    @blogpost_namespace.marshal_with(blogpost_model, skip_none=True)
+    @query_budget(max_statements=2, max_rows=2)
     @jwt_required()
+    @conditional(post_validators)
+    @serialize_with(blogpost_namespace, blogpost_model, skip_none=True)
     def get(self, blog_post_id):
         """Get a blog post by id"""
-        blog_posts = BlogPost.query.all()
-
-        treemap = binary_search_tree.TreeMap()
-        for post in blog_posts:
-            treemap[post.id] = binary_search_tree.Blogpost(post.id, post.title, post.body, post.date, post.user_id)
-        post = treemap.search(blog_post_id)
+        post = find_post(blog_post_id)
 
         if not post:
             return {"message": "post not found"}, HTTPStatus.NOT_FOUND
-        return post.value, HTTPStatus.OK
+        return post, HTTPStatus.OK
 
+    @query_budget(max_statements=6, max_rows=4)
     @blogpost_namespace.expect(new_blogpost_model)
     @blogpost_namespace.marshal_with(blogpost_model, skip_none=True)
     @jwt_required()
@@ -185,79 +419,58 @@ class GetUpdateDeleteOneBlogPost(Resource):
         """Update a blog post by id"""
         data = request.get_json()
 
-        email = get_jwt_identity()
-        current_user = User.query.filter_by(email=email).first()
-
-        blog_posts = BlogPost.query.all()
-        treemap = binary_search_tree.TreeMap()
-        for post in blog_posts:
-            treemap[post.id] = binary_search_tree.Blogpost(post.id, post.title, post.body, post.date, post.user_id)
-        post_found = treemap.search(blog_post_id)
+        post_index = get_post_index()
+        # the index may be behind other workers, the row is what counts
+        post_found = BlogPost.query.get(blog_post_id)
         if not post_found:
-            return {"message": "BlogPost not found"}
+            post_index.discard(blog_post_id)
+            return {"message": "BlogPost not found"}, HTTPStatus.NOT_FOUND
 
-        post_found = post_found.value
         if post_found.user_id != current_user.id:
             return {"message": "You are not authorized to update this blog!!!"}
-        post_found = BlogPost.query.filter_by(user_id=current_user.id).first()
         post_found.title = data["title"]
         post_found.body = data["body"]
-        db.session.commit()
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            raise Conflict("The blog post was changed by another request")
+        post_index.put(post_found)
 
         return post_found
 
 
+    @query_budget(max_statements=5, max_rows=3)
     @blogpost_namespace.marshal_with(blogpost_model, skip_none=True)
     @jwt_required()
     def delete(self, blog_post_id):
         """Delete a blog post by id"""
-        email = get_jwt_identity()
-        current_user = User.query.filter_by(email=email).first()
-
-        blog_posts = BlogPost.query.all()
-
-        treemap = binary_search_tree.TreeMap()
-        for post in blog_posts:
-            treemap[post.id] = binary_search_tree.Blogpost(post.id, post.title, post.body, post.date, post.user_id)
-        post_found = treemap.search(blog_post_id)
+        post_index = get_post_index()
+        post_found = BlogPost.query.get(blog_post_id)
 
         if not post_found:
+            post_index.discard(blog_post_id)
             return {"message": "post not found"}, HTTPStatus.NOT_FOUND
-        post_found = post_found.value
         if post_found.user_id != current_user.id:
             return {"message": "You are not authorized to delete this blog!!!"}
-        post = BlogPost.query.filter_by(user_id=current_user.id).first()
-        db.session.delete(post)
+        db.session.delete(post_found)
         db.session.commit()
+        post_index.discard(blog_post_id)
         return {'message': f'Successfully deleted post having id :{blog_post_id}'}, HTTPStatus.OK
 
+@blogpost_namespace.route('/blog_posts/index_stats', doc=False)
+class GetPostIndexStats(Resource):
+
+    def get(self):
+        return get_post_index().stats(), HTTPStatus.OK
+
 @blogpost_namespace.route('/blog_posts/numeric_body', doc=False)
 class GetNumericBlogPostBodies(Resource):
 
-    @blogpost_namespace.marshal_with(blogpost_model)
+    @query_budget(max_statements=1)
+    @serialize_with(blogpost_namespace, blogpost_model)
     def get(self):
-        blog_posts = BlogPost.query.all()
-        q = custom_queue.Queue()
-
-        for post in blog_posts:
-            q.enqueue(post)
-
-        return_list = []
-
-        for _ in range(len(blog_posts)):
-            post = q.dequeue()
-            numeric_body = 0
-            for char in post.data.body:
-                numeric_body += ord(char)
-
-            post.data.body = numeric_body
-            return_list.append(
-                {
-                    "id": post.data.id,
-                    "title": post.data.title,
-                    "body": post.data.body,
-                    "date": post.data.date,
-                    "user_id": post.data.user_id
-                }
-            )
-        return return_list, HTTPStatus.OK
\ No newline at end of file
+        blog_posts = db.session.query(
+            BlogPost.id, BlogPost.title, BlogPost.numeric_body.label('body'), BlogPost.date, BlogPost.user_id
+        ).all()
+        return blog_posts, HTTPStatus.OK
\ No newline at end of file
@@ -1,10 +1,20 @@
 from flask_restx import Namespace, Resource, fields
-from app.models import User, db
+from app.conditional import conditional, table_validators
+from app.models import ChangeCounter, User, db
+from app.hashing import get_password_hasher
+from app.post_index import get_post_index
+from app.user_cache import get_user_cache
+from app.query_budget import query_budget
+from app.serializer import serialize_with
+from app.streaming import NDJSON, streamable, stream_format, stream_params
 from http import HTTPStatus
-from flask import request
+from flask import request, current_app
 from data_structures import linked_list
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import BadRequest, Conflict
+import json
 
 user_namespace = Namespace('User', description="Namespace for User", path='/')
 
@@ -32,85 +42,185 @@ user_model = user_namespace.model(
 @user_namespace.route('/users')
 class CreateUser(Resource):
 
+    @query_budget(max_statements=4, max_rows=1)
     @user_namespace.expect(signup_model)
     @user_namespace.marshal_with(user_model)
     def post(self):
         data = request.get_json()
+        if User.query.filter_by(email=data.get('email')).first() is not None:
+            raise Conflict("A user with this email already exists")
+
         new_user = User(
             name=data.get('name'),
             email=data.get('email'),
-            password_hash=generate_password_hash(data.get('password')),
+            password_hash=get_password_hasher().generate(data.get('password')),
             address=data.get('address'),
             phone=data.get('phone')
         )
         db.session.add(new_user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise Conflict("A user with this email already exists")
 
         return new_user, HTTPStatus.CREATED
 
+def read_import_rows():
+    # NDJSON is consumed line by line so a large import never has to be
+    # held in memory; anything else must be a JSON array
+    if request.mimetype == NDJSON:
+        for number, line in enumerate(request.stream):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+        return
+
+    rows = request.get_json()
+    if not isinstance(rows, list):
+        raise BadRequest("Expected a JSON array of users")
+    yield from enumerate(rows)
+
+def validate_import_row(data):
+    if not isinstance(data, dict):
+        return "Row is not a JSON object"
+    for field in ('name', 'email', 'password'):
+        if not data.get(field):
+            return f"'{field}' is required"
+    return None
+
+def import_users(batch):
+    results = []
+    valid = []
+    for number, data in batch:
+        error = validate_import_row(data)
+        if error:
+            results.append({'row': number, 'status': 'failed', 'error': error})
+        else:
+            valid.append((number, data))
+
+    hashes = get_password_hasher().generate_many(data['password'] for _, data in valid)
+    mappings = [
+        {
+            'name': data.get('name'),
+            'email': data.get('email'),
+            'password_hash': password_hash,
+            'address': data.get('address'),
+            'phone': data.get('phone')
+        }
+        for (_, data), password_hash in zip(valid, hashes)
+    ]
+
+    try:
+        # bulk inserts skip the flush, so the users table is marked here
+        db.session.bulk_insert_mappings(User, mappings)
+        ChangeCounter.mark_changed(User.__tablename__)
+        db.session.commit()
+        errors = [None] * len(mappings)
+    except IntegrityError:
+        # find the offending rows by retrying the batch one row at a time
+        db.session.rollback()
+        errors = []
+        for mapping in mappings:
+            try:
+                db.session.bulk_insert_mappings(User, [mapping])
+                ChangeCounter.mark_changed(User.__tablename__)
+                db.session.commit()
+                errors.append(None)
+            except IntegrityError as e:
+                db.session.rollback()
+                errors.append(str(e.orig))
+
+    for (number, data), error in zip(valid, errors):
+        if error:
+            results.append({'row': number, 'email': data.get('email'), 'status': 'failed', 'error': error})
+        else:
+            results.append({'row': number, 'email': data.get('email'), 'status': 'created'})
+    return sorted(results, key=lambda result: result['row'])
+
+@user_namespace.route('/users/bulk')
+class BulkCreateUsers(Resource):
+
+    @user_namespace.expect([signup_model])
+    @user_namespace.doc(params={'batch_size': 'Rows hashed and inserted per batch'})
+    def post(self):
+        """Create many users from a JSON array or an application/x-ndjson stream"""
+        batch_size = request.args.get('batch_size', type=int) or current_app.config['USER_IMPORT_BATCH_SIZE']
+
+        results = []
+        batch = []
+        for row in read_import_rows():
+            batch.append(row)
+            if len(batch) >= batch_size:
+                results.extend(import_users(batch))
+                batch = []
+        if batch:
+            results.extend(import_users(batch))
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        return {'created': created, 'failed': len(results) - created, 'results': results}, HTTPStatus.OK
+
 @user_namespace.route('/users/descending_id')
 class GetAllUserDescending(Resource):
 
-    @user_namespace.marshal_with(user_model)
+    @query_budget(max_statements=2)
+    @user_namespace.doc(params=stream_params)
+    @conditional(lambda: table_validators(('users',), 'descending_id', stream_format()))
+    @streamable(lambda: User.query.order_by(desc(User.id)), user_model)
+    @serialize_with(user_namespace, user_model)
     def get(self):
-        users = User.query.all()
+        # plain rows of the listed columns, no ORM instances or per-row dicts
+        users = db.session.query(User.id, User.name, User.email, User.password_hash, User.address, User.phone).all()
         all_user_ll = linked_list.LinkedList()
         for user in users:
-            all_user_ll.insert_beginning(
-                {
-                    "id": user.id,
-                    "name": user.name,
-                    "email": user.email,
-                    "password_hash": user.password_hash,
-                    "address": user.address,
-                    "phone": user.phone
-                }
-            )
+            all_user_ll.insert_beginning(user)
         return (all_user_ll.to_list()), HTTPStatus.OK
 
 @user_namespace.route('/users/ascending_id')
 class GetAllUserAscending(Resource):
 
-    @user_namespace.marshal_with(user_model)
+    @query_budget(max_statements=2)
+    @user_namespace.doc(params=stream_params)
+    @conditional(lambda: table_validators(('users',), 'ascending_id', stream_format()))
+    @streamable(lambda: User.query.order_by(User.id), user_model)
+    @serialize_with(user_namespace, user_model)
     def get(self):
-        users = User.query.all()
+        # plain rows of the listed columns, no ORM instances or per-row dicts
+        users = db.session.query(User.id, User.name, User.email, User.password_hash, User.address, User.phone).all()
         all_user_ll = linked_list.LinkedList()
         for user in users:
-            all_user_ll.insert_at_end(
-                {
-                    "id": user.id,
-                    "name": user.name,
-                    "email": user.email,
-                    "password_hash": user.password_hash,
-                    "address": user.address,
-                    "phone": user.phone
-                }
-            )
+            all_user_ll.insert_at_end(user)
         return (all_user_ll.to_list()), HTTPStatus.OK
 
 @user_namespace.route('/users/<int:user_id>')
 class GetDeleteOneUser(Resource):
 
+    @query_budget(max_statements=1, max_rows=1)
     @user_namespace.marshal_with(user_model)
     def get(self, user_id):
-        users = User.query.all()
-        all_user_ll = linked_list.LinkedList()
-        for user in users:
-            all_user_ll.insert_beginning(
-                {
-                    "id": user.id,
-                    "name": user.name,
-                    "email": user.email,
-                    "address": user.address,
-                    "phone": user.phone
-                }
-            )
-        user = all_user_ll.get_user_by_id(user_id)
-
-        return user, HTTPStatus.OK
+        user = User.query.get(user_id)
+        if user is None:
+            return None, HTTPStatus.OK
+
+        return {
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "address": user.address,
+            "phone": user.phone
+        }, HTTPStatus.OK
 
     @user_namespace.marshal_with(user_model)
     def delete(self, user_id):
         user = User.query.filter_by(id=user_id).first()
+        post_ids = [post.id for post in user.posts]
         db.session.delete(user)
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+
+        post_index = get_post_index()
+        for post_id in post_ids:
+            post_index.discard(post_id)
+        get_user_cache().pop(user_id)
\ No newline at end of file
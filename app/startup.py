@@ -0,0 +1,106 @@
+"""Cold-start mode for short-lived workers.
+
+With LAZY_STARTUP the routers, and the post index and group committer only
+they use (with the data_structures behind them), are imported and set up on
+the first request instead of in create_app, and flask_migrate (alembic) is
+only loaded for the flask CLI.
+SWAGGER_SPEC_PATH points at a spec written at build time by
+`flask swagger dump`, served as is instead of being generated from the
+models in every worker.
+"""
+import json
+import os
+from threading import Lock
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+
+def load_extensions(app):
+    from app import group_commit, post_index
+
+    post_index.init_app(app)
+    group_commit.init_app(app)
+
+
+def register_namespaces(api):
+    from app.routers.users import user_namespace
+    from app.routers.blog_posts import blogpost_namespace
+    from app.routers.auth import auth_namespace
+
+    api.add_namespace(user_namespace)
+    api.add_namespace(blogpost_namespace)
+    api.add_namespace(auth_namespace)
+
+
+class Namespaces:
+    """Registers the API namespaces once, ahead of the first request when lazy."""
+
+    def __init__(self, app, api):
+        self.app = app
+        self.api = api
+        self.loaded = False
+        self.prebuilt_spec = False
+        self.lock = Lock()
+        self.wsgi_app = app.wsgi_app
+
+    def load(self):
+        with self.lock:
+            if not self.loaded:
+                load_extensions(self.app)
+                register_namespaces(self.api)
+                self.loaded = True
+
+    def __call__(self, environ, start_response):
+        # a prebuilt spec is served without importing the routers
+        if not self.loaded and not (self.prebuilt_spec and environ.get('PATH_INFO') == '/swagger.json'):
+            self.load()
+        return self.wsgi_app(environ, start_response)
+
+
+def init_app(app, api):
+    namespaces = Namespaces(app, api)
+    app.extensions['namespaces'] = namespaces
+    if app.config.get('LAZY_STARTUP'):
+        app.wsgi_app = namespaces
+    else:
+        namespaces.load()
+
+    spec_path = app.config.get('SWAGGER_SPEC_PATH')
+    if spec_path and os.path.exists(spec_path):
+        with open(spec_path) as spec:
+            # read by Api.__schema__, which only generates the spec when unset
+            api._schema = json.load(spec)
+        namespaces.prebuilt_spec = True
+    elif spec_path:
+        app.logger.warning(f"{spec_path} not found, the Swagger spec is generated at runtime")
+    app.cli.add_command(swagger_cli)
+
+
+def wants_migrate(app):
+    # the flask CLI loads the app inside a click context, workers do not
+    return not app.config.get('LAZY_STARTUP') or click.get_current_context(silent=True) is not None
+
+
+def generate_spec(app):
+    from flask_restx.swagger import Swagger
+
+    namespaces = app.extensions['namespaces']
+    namespaces.load()
+    with app.test_request_context():
+        return Swagger(namespaces.api).as_dict()
+
+
+swagger_cli = AppGroup('swagger', help="Build the Swagger spec served with SWAGGER_SPEC_PATH.")
+
+
+@swagger_cli.command('dump')
+@click.option('--output', default=None, help="Defaults to SWAGGER_SPEC_PATH.")
+def dump_command(output):
+    """Write the Swagger spec generated from the models."""
+    output = output or current_app.config.get('SWAGGER_SPEC_PATH')
+    if not output:
+        raise click.UsageError('pass --output or set SWAGGER_SPEC_PATH')
+    with open(output, 'w') as spec:
+        json.dump(generate_spec(current_app), spec, indent=2, sort_keys=True)
+    click.echo(f'wrote {output}')
@@ -0,0 +1,59 @@
+from functools import wraps
+from flask import Response, request, stream_with_context
+from app.serializer import compile_model, dumps
+
+NDJSON = 'application/x-ndjson'
+
+stream_params = {
+    'stream': "Stream rows as they are read instead of buffering the listing: 'ndjson' or 'json' "
+              "(an 'Accept: application/x-ndjson' header also selects ndjson)"
+}
+
+
+def stream_format(req=None):
+    req = request if req is None else req
+    stream = req.args.get('stream', '').lower()
+    if stream in ('ndjson', NDJSON):
+        return 'ndjson'
+    if stream and stream not in ('0', 'false', 'no'):
+        return 'json'
+    if req.accept_mimetypes.best == NDJSON:
+        return 'ndjson'
+    return None
+
+
+def stream_rows(query, serialize, fmt, batch_size=1000):
+    # yield_per keeps a server-side cursor open, so only one batch of rows
+    # is held in memory at any point
+    rows = query.yield_per(batch_size)
+    if fmt == 'ndjson':
+        for row in rows:
+            yield dumps(serialize(row)) + b'\n'
+        return
+
+    yield b'['
+    separator = b''
+    for row in rows:
+        yield separator + dumps(serialize(row))
+        separator = b','
+    yield b']'
+
+
+def streamable(query_factory, model):
+    """Serve the listing as a stream when the client asks for one.
+
+    Anything else falls through to the decorated (marshalled) handler, whose
+    Swagger documentation is kept.
+    """
+    serialize = compile_model(model)
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            fmt = stream_format()
+            if fmt is None:
+                return f(*args, **kwargs)
+            mimetype = NDJSON if fmt == 'ndjson' else 'application/json'
+            return Response(stream_with_context(stream_rows(query_factory(), serialize, fmt)), mimetype=mimetype)
+        return wrapper
+    return decorator
@@ -0,0 +1,91 @@
+import unittest, asyncio, json
+from .. import create_app
+from app.asgi import AsyncReadApp
+from app.models import db
+from app.config import config_dict
+
+class TestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(config=config_dict['test'])
+        cls.client = cls.app.test_client()
+        cls.asgi = AsyncReadApp(cls.app)
+        cls._ctx = cls.app.app_context()
+        cls._ctx.push()
+        db.create_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls._ctx.pop()
+
+    def asgi_get(self, path, headers=None, query_string=b'', method='GET', body=b''):
+        async def call():
+            messages = []
+            scope = {
+                'type': 'http', 'method': method, 'path': path, 'query_string': query_string,
+                'headers': [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+                'http_version': '1.1', 'scheme': 'http', 'server': ('localhost', 80)
+            }
+
+            async def receive():
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            await self.asgi(scope, receive, send)
+            if self.asgi.engine is not None:
+                await self.asgi.engine.dispose()
+            return messages
+
+        messages = asyncio.run(call())
+        headers = {name.decode().lower(): value.decode() for name, value in messages[0]['headers']}
+        return messages[0]['status'], headers, b''.join(message.get('body', b'') for message in messages[1:])
+
+    def log_in(self, email):
+        self.client.post('/users', json={"name": "async", "email": email, "password": "password", "address": "", "phone": ""})
+        tokens = self.client.post('/auth/login', json={"email": email, "password": "password"}).json
+        return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    def test_matches_wsgi_responses(self):
+        headers = self.log_in("asyncuser@company.com")
+        for i in range(3):
+            post_id = self.client.post('/blog_posts/users/', json={"title": f"Async {i}", "body": "Async"}, headers=headers).json["id"]
+
+        for path, request_headers, query_string in (
+            ('/blog_posts/bulkFetch', dict(headers, Limit='2'), b''),
+            (f'/blog_posts/{post_id}', headers, b''),
+            ('/users/ascending_id', {}, b''),
+            ('/users/descending_id', {}, b'stream=ndjson'),
+        ):
+            expected = self.client.get(f'{path}?{query_string.decode()}', headers=request_headers)
+            status, response_headers, body = self.asgi_get(path, request_headers, query_string)
+
+            assert status == expected.status_code == 200
+            assert body == expected.data
+            assert response_headers['etag'] == expected.headers['ETag']
+            assert response_headers.get('next-cursor') == expected.headers.get('Next-Cursor')
+
+            status, _, body = self.asgi_get(path, dict(request_headers, **{'If-None-Match': expected.headers['ETag']}), query_string)
+            assert status == 304
+            assert body == b''
+
+    def test_shares_jwt_validation(self):
+        status, _, body = self.asgi_get('/blog_posts/bulkFetch')
+        assert status == 401
+        assert json.loads(body) == self.client.get('/blog_posts/bulkFetch').json
+
+        headers = self.log_in("asyncmissing@company.com")
+        status, _, body = self.asgi_get('/blog_posts/999999', headers)
+        assert status == 404
+        assert json.loads(body) == {"message": "post not found"}
+
+    def test_other_routes_reach_the_flask_app(self):
+        self.log_in("asyncwrite@company.com")
+        body = json.dumps({"email": "asyncwrite@company.com", "password": "password"}).encode()
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body))}
+        status, _, response = self.asgi_get('/auth/login', headers, method='POST', body=body)
+        assert status == 200
+        assert 'access_token' in json.loads(response)
@@ -1,7 +1,9 @@
 import unittest, json
+from datetime import date
 from .. import create_app
 from app.models import db, User, BlogPost
 from app.config import config_dict
+from app.post_index import get_post_index
 
 class TestCase(unittest.TestCase):
     @classmethod
@@ -27,10 +29,10 @@ class TestCase(unittest.TestCase):
         db.session.close()
         self._ctx.pop()
 
-    def create_user(self):
+    def create_user(self, email="testuser@company.com"):
         data = {
             "name": "testuser",
-            "email": "testuser@company.com",
+            "email": email,
             "password": "password",
             "address": "testaddress",
             "phone": "XXXXXXXXXX"
@@ -38,9 +40,9 @@ class TestCase(unittest.TestCase):
         new_user_response = self.client.post('/users', json=data)
         return
 
-    def log_in(self):
+    def log_in(self, email="testuser@company.com"):
         data = {
-            "email": "testuser@company.com",
+            "email": email,
             "password": "password"
         }
         response = self.client.post('/auth/login', json=data)
@@ -50,6 +52,23 @@ class TestCase(unittest.TestCase):
         }
         return headers
 
+    def test_bulk_remove_latest(self):
+        self.create_user("removeuser@company.com")
+        headers = self.log_in("removeuser@company.com")
+        post_ids = []
+        for i in range(3):
+            post_response = self.client.post('/blog_posts/users/', json={"title": f"Remove {i}", "body": "Remove"}, headers=headers)
+            post_ids.append(post_response.json["id"])
+
+        delete_response = self.client.delete('/blog_posts/bulkRemove', headers=dict(headers, Limit='2'))
+
+        assert delete_response.status_code == 200
+        assert delete_response.json["deleted"] == 2
+        assert BlogPost.query.get(post_ids[0]) is not None
+        assert BlogPost.query.get(post_ids[1]) is None
+        assert BlogPost.query.get(post_ids[2]) is None
+        assert self.client.get(f'/blog_posts/{post_ids[2]}', headers=headers).status_code == 404
+
     def test_get_create_blogpost(self):
         self.create_user()
         headers = self.log_in()
@@ -82,8 +101,7 @@ class TestCase(unittest.TestCase):
         blogpost_id = post_response.json["id"]
         get_response = self.client.get(f'/blog_posts/{blogpost_id}', headers=headers)
 
-        current_user = User.query.filter_by(email='testuser@company.com').first()
-        blog_post = BlogPost.query.filter_by(user_id=current_user.id).first()
+        blog_post = BlogPost.query.get(blogpost_id)
 
         assert get_response.status_code == 200
         assert blog_post.title == data.get("title") == get_response.json["title"]
@@ -103,4 +121,255 @@ class TestCase(unittest.TestCase):
         # Test: Delete a blog post by id
         delete_response = self.client.delete(f'/blog_posts/{blogpost_id}', headers=headers)
 
-        assert delete_response.status_code == 200
\ No newline at end of file
+        assert delete_response.status_code == 200
+
+    def test_post_index_tracks_writes(self):
+        self.create_user("indexuser@company.com")
+        headers = self.log_in("indexuser@company.com")
+        data = {
+            "title": "Indexed",
+            "body": "Indexed body"
+        }
+        post_response = self.client.post('/blog_posts/users/', json=data, headers=headers)
+        blogpost_id = post_response.json["id"]
+        # the index is loaded by the first search, single lookups do not load it
+        get_post_index().invalidate()
+        assert self.client.get(f'/blog_posts/{blogpost_id}', headers=headers).json["body"] == "Indexed body"
+        assert get_post_index().treemap is None
+        self.client.get('/blog_posts/bulkFetch', headers=dict(headers, Search='Indexed'))
+        assert not hasattr(get_post_index().treemap[blogpost_id], 'body')
+
+        before = self.client.get('/blog_posts/index_stats').json
+        get_response = self.client.get(f'/blog_posts/{blogpost_id}', headers=headers)
+        after = self.client.get('/blog_posts/index_stats').json
+
+        assert get_response.json["title"] == "Indexed"
+        assert after["hits"] == before["hits"] + 1
+
+        new_data = {
+            "title": "Indexed Updated",
+            "body": "Indexed body updated"
+        }
+        self.client.patch(f'/blog_posts/{blogpost_id}', json=new_data, headers=headers)
+        get_response = self.client.get(f'/blog_posts/{blogpost_id}', headers=headers)
+        assert get_response.json["title"] == "Indexed Updated"
+
+        self.client.delete(f'/blog_posts/{blogpost_id}', headers=headers)
+        get_response = self.client.get(f'/blog_posts/{blogpost_id}', headers=headers)
+        assert get_response.status_code == 404
+
+    def test_post_index_follows_other_workers(self):
+        # a second app stands in for another worker writing to the same table
+        other = create_app(config=config_dict['test']).test_client()
+        self.create_user("workeruser@company.com")
+        headers = self.log_in("workeruser@company.com")
+        post_response = self.client.post('/blog_posts/users/', json={"title": "Worker", "body": "Worker body"}, headers=headers)
+        blogpost_id = post_response.json["id"]
+        self.client.get('/blog_posts/bulkFetch', headers=dict(headers, Search='Worker'))
+
+        other.patch(f'/blog_posts/{blogpost_id}', json={"title": "Worker Updated", "body": "Worker body"}, headers=headers)
+        # a cold user cache and a stale entry still fit the query budget
+        self.app.extensions['user_cache'].clear()
+        get_response = self.client.get(f'/blog_posts/{blogpost_id}', headers=headers)
+        assert get_response.status_code == 200
+        assert get_response.json["title"] == "Worker Updated"
+        range_response = self.client.get(f'/blog_posts/range/ids?start={blogpost_id}&limit=1', headers=headers)
+        assert range_response.json[0]["title"] == "Worker Updated"
+
+        other.delete(f'/blog_posts/{blogpost_id}', headers=headers)
+        assert self.client.get(f'/blog_posts/{blogpost_id}', headers=headers).status_code == 404
+        assert self.client.patch(f'/blog_posts/{blogpost_id}', json={"title": "Gone", "body": "Gone"}, headers=headers).status_code == 404
+        assert self.client.delete(f'/blog_posts/{blogpost_id}', headers=headers).status_code == 404
+        range_response = self.client.get(f'/blog_posts/range/ids?start={blogpost_id}&limit=1', headers=headers)
+        assert [post["id"] for post in range_response.json] != [blogpost_id]
+
+    def test_search_follows_other_workers(self):
+        other = create_app(config=config_dict['test']).test_client()
+        self.create_user("searchworker@company.com")
+        headers = self.log_in("searchworker@company.com")
+        apples = [self.client.post('/blog_posts/users/', json={"title": f"Apple {i}", "body": "Fruit"}, headers=headers).json["id"] for i in range(2)]
+        cherries = [self.client.post('/blog_posts/users/', json={"title": f"Cherry {i}", "body": "Fruit"}, headers=headers).json["id"] for i in range(4)]
+
+        def search(text, **extra):
+            response = self.client.get('/blog_posts/bulkFetch', headers=dict(headers, Search=text, **extra))
+            return [post["post_id"] for post in response.json], response.headers.get('Next-Cursor')
+
+        assert search('Apple')[0] == apples[::-1]
+        for post_id in apples:
+            other.patch(f'/blog_posts/{post_id}', json={"title": f"Banana {post_id}", "body": "Fruit"}, headers=headers)
+        assert search('Apple')[0] == []
+        assert search('Banana')[0] == apples[::-1]
+
+        for post_id in cherries[2:]:
+            other.delete(f'/blog_posts/{post_id}', headers=headers)
+        page, cursor = search('Cherry', Limit='2')
+        assert page == cherries[1::-1]
+        assert cursor
+
+    def test_post_by_user_deleted_elsewhere(self):
+        other = create_app(config=config_dict['test']).test_client()
+        self.create_user("deleteduser@company.com")
+        headers = self.log_in("deleteduser@company.com")
+        user_id = User.query.filter_by(email="deleteduser@company.com").first().id
+        self.client.get('/blog_posts/users/', headers=headers)
+
+        other.delete(f'/users/{user_id}')
+        response = self.client.post('/blog_posts/users/', json={"title": "Orphan", "body": "Orphan"}, headers=headers)
+        assert response.status_code == 401
+        assert self.client.post('/blog_posts/users/', json={"title": "Orphan", "body": "Orphan"}, headers=headers).status_code == 401
+        assert BlogPost.query.filter_by(title="Orphan").first() is None
+
+    def test_bulk_fetch_cursor_pagination(self):
+        self.create_user("pageuser@company.com")
+        headers = self.log_in("pageuser@company.com")
+        for i in range(5):
+            self.client.post('/blog_posts/users/', json={"title": f"Paged {i}", "body": "Paged"}, headers=headers)
+
+        seen = []
+        cursor = None
+        while True:
+            page_headers = dict(headers, Limit='2', Search='Paged')
+            if cursor:
+                page_headers['Cursor'] = cursor
+            response = self.client.get('/blog_posts/bulkFetch', headers=page_headers)
+            assert response.status_code == 200
+            seen.extend(post["post_id"] for post in response.json)
+            cursor = response.headers.get('Next-Cursor')
+            if not cursor:
+                break
+
+        assert len(seen) == 5
+        assert seen == sorted(seen, reverse=True)
+
+        self.app.config['SEARCH_MAX_LIMIT'] = 3
+        try:
+            response = self.client.get('/blog_posts/bulkFetch', headers=dict(headers, Search='Paged'))
+        finally:
+            self.app.config['SEARCH_MAX_LIMIT'] = 1000
+        assert [post["post_id"] for post in response.json] == seen[:3]
+        assert response.headers['Next-Cursor']
+
+        response = self.client.get('/blog_posts/bulkFetch', headers=dict(headers, Cursor='bogus'))
+        assert response.status_code == 400
+
+    def test_numeric_body_maintained_on_write(self):
+        self.create_user("numericuser@company.com")
+        headers = self.log_in("numericuser@company.com")
+        post_response = self.client.post('/blog_posts/users/', json={"title": "Numeric", "body": "abc"}, headers=headers)
+        blogpost_id = post_response.json["id"]
+        self.client.patch(f'/blog_posts/{blogpost_id}', json={"title": "Numeric", "body": "abcd"}, headers=headers)
+
+        response = self.client.get('/blog_posts/numeric_body')
+        post = next(post for post in response.json if post["id"] == blogpost_id)
+
+        assert post["body"] == str(sum(map(ord, "abcd")))
+
+    def test_current_user_cached_and_invalidated(self):
+        self.create_user("cacheuser@company.com")
+        headers = self.log_in("cacheuser@company.com")
+        user = User.query.filter_by(email="cacheuser@company.com").first()
+
+        post_response = self.client.post('/blog_posts/users/', json={"title": "Cached", "body": "Cached"}, headers=headers)
+        assert post_response.json["user_id"] == user.id
+        assert self.app.extensions['user_cache'].get(user.id).email == "cacheuser@company.com"
+
+        self.client.delete(f'/users/{user.id}')
+        assert self.app.extensions['user_cache'].get(user.id) is None
+
+        response = self.client.get('/blog_posts/users/', headers=headers)
+        assert response.status_code == 401
+
+    def test_conditional_get(self):
+        self.create_user("etaguser@company.com")
+        headers = self.log_in("etaguser@company.com")
+        post_response = self.client.post('/blog_posts/users/', json={"title": "Tagged", "body": "Tagged"}, headers=headers)
+        blogpost_id = post_response.json["id"]
+
+        response = self.client.get(f'/blog_posts/{blogpost_id}', headers=headers)
+        etag = response.headers['ETag']
+        assert response.status_code == 200
+        assert response.headers['Last-Modified']
+
+        response = self.client.get(f'/blog_posts/{blogpost_id}', headers=dict(headers, **{'If-None-Match': etag}))
+        assert response.status_code == 304
+        assert response.data == b''
+
+        self.client.patch(f'/blog_posts/{blogpost_id}', json={"title": "Retagged", "body": "Tagged"}, headers=headers)
+        response = self.client.get(f'/blog_posts/{blogpost_id}', headers=dict(headers, **{'If-None-Match': etag}))
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+        # a patch through another worker retags the post here as well
+        etag = response.headers['ETag']
+        other = create_app(config=config_dict['test']).test_client()
+        other.patch(f'/blog_posts/{blogpost_id}', json={"title": "Retagged elsewhere", "body": "Tagged"}, headers=headers)
+        response = self.client.get(f'/blog_posts/{blogpost_id}', headers=dict(headers, **{'If-None-Match': etag}))
+        assert response.status_code == 200
+        assert response.json["title"] == "Retagged elsewhere"
+        assert self.client.get(f'/blog_posts/{blogpost_id}', headers=dict(headers, **{'If-None-Match': response.headers['ETag']})).status_code == 304
+
+        page_headers = dict(headers, Limit='2')
+        etag = self.client.get('/blog_posts/bulkFetch', headers=page_headers).headers['ETag']
+        assert self.client.get('/blog_posts/bulkFetch', headers=dict(page_headers, **{'If-None-Match': etag})).status_code == 304
+        assert self.client.get('/blog_posts/bulkFetch', headers=dict(page_headers, Limit='3', **{'If-None-Match': etag})).status_code == 200
+
+        self.client.post('/blog_posts/users/', json={"title": "Newer", "body": "Newer"}, headers=headers)
+        assert self.client.get('/blog_posts/bulkFetch', headers=dict(page_headers, **{'If-None-Match': etag})).status_code == 200
+
+    def test_batch_get(self):
+        self.create_user("batchuser@company.com")
+        headers = self.log_in("batchuser@company.com")
+        ids = [self.client.post('/blog_posts/users/', json={"title": f"Batch {i}", "body": "Batch"}, headers=headers).json["id"] for i in range(3)]
+        missing = max(ids) + 1000
+
+        requested = [ids[2], missing, ids[0], ids[2]]
+        response = self.client.get(f'/blog_posts/batch?ids={",".join(map(str, requested))}', headers=headers)
+        assert response.status_code == 200
+        assert [post["id"] for post in response.json["posts"]] == [ids[2], ids[0], ids[2]]
+        assert response.json["missing"] == [missing]
+        assert response.json["posts"][1] == self.client.get(f'/blog_posts/{ids[0]}', headers=headers).json
+
+        response = self.client.post('/blog_posts/batch', json={"ids": requested}, headers=headers)
+        assert response.status_code == 200
+        assert [post["id"] for post in response.json["posts"]] == [ids[2], ids[0], ids[2]]
+
+        assert self.client.get('/blog_posts/batch?ids=1,x', headers=headers).status_code == 400
+        assert self.client.get('/blog_posts/batch', headers=headers).status_code == 400
+        too_many = ",".join(map(str, range(self.app.config['BATCH_MAX_IDS'] + 1)))
+        assert self.client.get(f'/blog_posts/batch?ids={too_many}', headers=headers).status_code == 400
+
+    def test_id_and_date_ranges(self):
+        self.create_user("rangeuser@company.com")
+        headers = self.log_in("rangeuser@company.com")
+        user = User.query.filter_by(email="rangeuser@company.com").first()
+        posts = [BlogPost(title=f"Range {i}", body="Range", date=date(2021, 3, 1 + i % 4), user_id=user.id) for i in range(12)]
+        db.session.add_all(posts)
+        db.session.commit()
+        ids = [post.id for post in posts]
+
+        def pages(path, **params):
+            found = []
+            while True:
+                response = self.client.get(path, query_string=params, headers=headers)
+                assert response.status_code == 200
+                found += [post["id"] for post in response.json]
+                if "Next-Cursor" not in response.headers:
+                    return found
+                params["Cursor"] = response.headers["Next-Cursor"]
+
+        in_range = [post.id for post in sorted(posts, key=lambda post: (post.date, post.id))
+                    if date(2021, 3, 2) <= post.date <= date(2021, 3, 3)]
+        for warm in (False, True):
+            index = get_post_index()
+            index.invalidate()
+            if warm:
+                index.rebuild()
+            assert pages('/blog_posts/range/ids', start=ids[2], end=ids[9], limit=3) == ids[2:9]
+            assert pages('/blog_posts/range/ids', start=ids[0], limit=5)[:12] == ids
+            assert pages('/blog_posts/range/dates', start='2021-03-02', end='2021-03-03', limit=2) == in_range
+            assert (index.treemap is not None) == warm
+
+        response = self.client.get('/blog_posts/range/dates?start=2021-03-01&end=2021-03-01', headers=headers)
+        assert response.json[0] == self.client.get(f'/blog_posts/{ids[0]}', headers=headers).json
+        assert self.client.get('/blog_posts/range/ids?limit=0', headers=headers).status_code == 400
+        assert self.client.get('/blog_posts/range/dates?Cursor=bad', headers=headers).status_code == 400
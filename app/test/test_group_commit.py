@@ -0,0 +1,84 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import ServiceUnavailable
+from .. import create_app
+from app.group_commit import GroupCommitter, get_group_committer
+from app.models import db, BlogPost, User
+from app.config import config_dict
+
+class TestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        class GroupCommitConfig(config_dict['test']):
+            GROUP_COMMIT_ENABLED = True
+            GROUP_COMMIT_WINDOW_MS = 200
+            GROUP_COMMIT_MAX_BATCH = 8
+
+        cls.app = create_app(config=GroupCommitConfig)
+        cls.client = cls.app.test_client()
+        cls._ctx = cls.app.app_context()
+        cls._ctx.push()
+        db.create_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls._ctx.pop()
+
+    def log_in(self, email):
+        self.client.post('/users', json={"name": "group", "email": email, "password": "password", "address": "", "phone": ""})
+        tokens = self.client.post('/auth/login', json={"email": email, "password": "password"}).json
+        return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    def test_concurrent_posts_share_a_commit(self):
+        headers = self.log_in("groupcommit@company.com")
+        committer = get_group_committer()
+        batches = committer.batches
+
+        def create(i):
+            return self.app.test_client().post('/blog_posts/users/', json={"title": f"Group {i}", "body": "Group"}, headers=headers)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(create, range(8)))
+
+        self.assertEqual([response.status_code for response in responses], [201] * 8)
+        ids = {response.json["id"] for response in responses}
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(committer.batches - batches, 1)
+        db.session.remove()
+        self.assertEqual({post.id for post in BlogPost.query.filter(BlogPost.title.like("Group %"))}, ids)
+        self.assertEqual(self.client.get(f'/blog_posts/{min(ids)}', headers=headers).json["title"],
+                         responses[[r.json["id"] for r in responses].index(min(ids))].json["title"])
+
+    def test_failed_row_only_fails_its_own_insert(self):
+        user_id = User.query.first().id
+        committer = get_group_committer()
+
+        def insert(values):
+            try:
+                return committer.insert(BlogPost, **values)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            good, bad = pool.map(insert, [{"title": "Good", "body": "Good", "user_id": user_id},
+                                          {"title": "Bad", "body": "Bad", "user_id": None}])
+        self.assertIsInstance(good, BlogPost)
+        self.assertIsNotNone(good.id)
+        self.assertIsInstance(bad, Exception)
+
+    def test_timed_out_insert_is_withdrawn(self):
+        user_id = User.query.first().id
+        self.app.config['GROUP_COMMIT_TIMEOUT'] = 0.05
+        try:
+            committer = GroupCommitter(self.app)
+        finally:
+            self.app.config['GROUP_COMMIT_TIMEOUT'] = 10
+        # no flusher runs, so the row stays queued past the timeout
+        committer.flusher = object()
+
+        with self.assertRaises(ServiceUnavailable):
+            committer.insert(BlogPost, title="Withdrawn", body="Withdrawn", user_id=user_id)
+        self.assertEqual(committer.next_batch(), [])
+        self.assertIsNone(BlogPost.query.filter_by(title="Withdrawn").first())
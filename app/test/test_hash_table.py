@@ -0,0 +1,31 @@
+import unittest, random
+from data_structures import hash_table
+
+class TestCase(unittest.TestCase):
+
+    def test_matches_dict(self):
+        rng = random.Random(3)
+        ht = hash_table.HashTable(10)
+        expected = {}
+        for _ in range(5000):
+            key = f"key{rng.randint(0, 800)}"
+            action = rng.random()
+            if action < 0.5:
+                ht.add_key_value(key, action)
+                expected[key] = action
+            elif action < 0.75:
+                assert ht.delete_key(key) == (key in expected)
+                expected.pop(key, None)
+            else:
+                assert ht.get_value(key) == expected.get(key)
+
+        assert len(ht) == len(expected)
+        assert dict(ht) == expected
+        assert ht.size <= ht.table_size * ht.max_load
+
+    def test_single_entry_bucket_checks_key(self):
+        ht = hash_table.HashTable(10)
+        ht.add_key_value("title", "Title")
+
+        assert ht.get_value("title") == "Title"
+        assert ht.get_value("body") is None
@@ -0,0 +1,45 @@
+import unittest
+from datetime import date
+from sqlalchemy import create_engine, desc, select
+from app.models import db, User, BlogPost
+from app.routers.blog_posts import date_range_statement
+
+class TestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # query plans are checked on a throwaway SQLite schema built from the models
+        cls.engine = create_engine('sqlite://')
+        db.metadata.create_all(cls.engine)
+
+    def query_plan(self, statement):
+        compiled = statement.compile(self.engine, compile_kwargs={"literal_binds": True})
+        with self.engine.connect() as connection:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+        return " | ".join(row[-1] for row in rows)
+
+    def test_user_lookup_by_email_uses_index(self):
+        plan = self.query_plan(select(User).where(User.email == 'testuser@company.com'))
+        assert "USING INDEX ix_users_email" in plan
+
+    def test_user_posts_use_composite_index(self):
+        plan = self.query_plan(select(BlogPost).where(BlogPost.user_id == 1).order_by(desc(BlogPost.id)).limit(10))
+        assert "USING INDEX ix_blog_posts_user_id_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_date_range_uses_index(self):
+        plan = self.query_plan(select(BlogPost).where(BlogPost.date.between(date(2022, 1, 1), date(2022, 2, 1))))
+        assert "USING INDEX ix_blog_posts_date_id" in plan
+
+    def test_date_range_pages_in_index_order(self):
+        statement = date_range_statement((date(2022, 1, 1), 40), (date(2022, 2, 1),), 101)
+        plan = self.query_plan(statement)
+        assert "USING INDEX ix_blog_posts_date_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_email_is_unique(self):
+        with self.assertRaises(Exception):
+            with self.engine.begin() as connection:
+                connection.execute(User.__table__.insert(), [
+                    {"email": "dup@company.com", "password_hash": "x"},
+                    {"email": "dup@company.com", "password_hash": "x"}
+                ])
@@ -0,0 +1,9 @@
+import unittest
+from app.numeric_body import numeric_bodies, numeric_body
+
+class TestCase(unittest.TestCase):
+
+    def test_batch_matches_single(self):
+        bodies = ["abc", "", None, "héllo \U0001F600" * 50, "x" * 10000]
+        assert numeric_bodies(bodies) == [numeric_body(body) for body in bodies]
+        assert numeric_bodies([]) == []
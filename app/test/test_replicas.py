@@ -0,0 +1,78 @@
+import unittest, os, tempfile
+from .. import create_app
+from app.models import db, User
+from app.config import config_dict
+
+class TestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        primary, replica = (os.path.join(cls.directory.name, name) for name in ('primary.db', 'replica.db'))
+
+        class ReplicaConfig(config_dict['test']):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{primary}'
+            SQLALCHEMY_REPLICA_URIS = [f'sqlite:///{replica}']
+            SQLALCHEMY_ECHO = False
+
+        cls.app = create_app(config=ReplicaConfig)
+        cls.client = cls.app.test_client()
+        cls._ctx = cls.app.app_context()
+        cls._ctx.push()
+        cls.primary = db.get_engine(cls.app)
+        cls.replica = db.get_engine(cls.app, 'replica_0')
+        db.metadata.create_all(cls.primary)
+        db.metadata.create_all(cls.replica)
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        cls._ctx.pop()
+        cls.primary.dispose()
+        cls.replica.dispose()
+        cls.directory.cleanup()
+
+    def tearDown(self):
+        db.session.remove()
+
+    def add_user(self, engine, email):
+        with engine.begin() as conn:
+            conn.execute(User.__table__.insert(), {"name": email, "email": email, "password_hash": "x"})
+
+    def test_get_reads_from_replica(self):
+        response = self.client.post('/users', json={"name": "primary", "email": "primary@company.com", "password": "password", "address": "", "phone": ""})
+        self.assertEqual(response.status_code, 201)
+        self.add_user(self.replica, "replica@company.com")
+
+        emails = [user["email"] for user in self.client.get('/users/ascending_id').json]
+        self.assertIn("replica@company.com", emails)
+        self.assertNotIn("primary@company.com", emails)
+        with self.primary.connect() as conn:
+            self.assertIsNotNone(conn.execute(User.__table__.select().where(User.email == "primary@company.com")).first())
+
+    def test_reads_after_write_stay_on_primary(self):
+        with self.app.test_request_context(method='GET'):
+            self.assertIs(db.session.get_bind(User.__mapper__), self.replica)
+            db.session.add(User(name="sticky", email="sticky@company.com", password_hash="x"))
+            db.session.flush()
+            self.assertIs(db.session.get_bind(User.__mapper__), self.primary)
+            self.assertIsNotNone(User.query.filter_by(email="sticky@company.com").first())
+            db.session.rollback()
+            db.session.remove()
+
+        with self.app.test_request_context(method='POST'):
+            self.assertIs(db.session.get_bind(User.__mapper__), self.primary)
+        with self.app.test_request_context(method='GET'):
+            self.assertIs(db.session.get_bind(User.__mapper__), self.replica)
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        class BrokenReplicaConfig(config_dict['test']):
+            SQLALCHEMY_DATABASE_URI = self.app.config['SQLALCHEMY_DATABASE_URI']
+            SQLALCHEMY_REPLICA_URIS = [f'sqlite:///{self.directory.name}/missing/replica.db']
+            SQLALCHEMY_ECHO = False
+
+        app = create_app(config=BrokenReplicaConfig)
+        self.add_user(self.primary, "fallback@company.com")
+        with app.app_context(), self.assertLogs(app.logger, 'WARNING'):
+            emails = [user["email"] for user in app.test_client().get('/users/descending_id').json]
+            db.session.remove()
+        self.assertIn("fallback@company.com", emails)
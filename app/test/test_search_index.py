@@ -0,0 +1,29 @@
+import unittest
+from data_structures import search_index
+
+class TestCase(unittest.TestCase):
+
+    def test_substring_search(self):
+        index = search_index.SearchIndex()
+        index.add(1, "Flask tips and tricks")
+        index.add(2, "Tricks of the trade")
+        index.add(3, "SQL tips")
+
+        assert index.search("tips") == [3, 1]
+        assert index.search("ricks") == [2, 1]
+        assert index.search("Tricks") == [2]
+        assert index.search("nothing") == []
+        assert index.search("ti") is None
+
+    def test_update_and_remove(self):
+        index = search_index.SearchIndex()
+        index.add(1, "First title")
+        index.add(1, "Second title")
+
+        assert index.search("First") == []
+        assert index.search("Second") == [1]
+
+        assert index.remove(1)
+        assert not index.remove(1)
+        assert index.search("title") == []
+        assert index.postings == {}
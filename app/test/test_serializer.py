@@ -0,0 +1,34 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from flask_restx import fields, marshal
+from app.routers.blog_posts import blogpost_batch_model, blogpost_detailed_model, blogpost_model
+from app.serializer import NestedFields, compile_model
+
+class TestCase(unittest.TestCase):
+
+    def test_matches_marshal(self):
+        row = SimpleNamespace(post_id=1, title="Title", body="Body", date=date(2022, 5, 1), id=7,
+                              name="name", email="a@b.c", address=None, phone="123")
+        rows = [row, SimpleNamespace(post_id=2, title=None, body=3, date=None, id=None)]
+
+        assert compile_model(blogpost_detailed_model)(rows) == marshal(rows, blogpost_detailed_model)
+        for skip_none in (False, True):
+            for data in ({"message": "post not found"}, row, None):
+                assert compile_model(blogpost_model, skip_none)(data) == marshal(data, blogpost_model, skip_none=skip_none)
+
+    def test_nested_and_fallback_fields(self):
+        inner = {'id': fields.Integer(default=5), 'tags': fields.List(fields.String)}
+        model = {
+            'inner': fields.Nested(inner, allow_null=True),
+            'same': NestedFields(inner),
+            'renamed': fields.String(attribute='inner.tags'),
+            'flag': fields.Boolean
+        }
+        for data in ({'inner': {'id': None, 'tags': ['a', 'b']}, 'id': 1, 'tags': [], 'flag': 0}, {'inner': None}):
+            assert compile_model(model)(data) == marshal(data, model)
+
+    def test_list_of_nested(self):
+        row = SimpleNamespace(id=1, title="Title", body=None, date=date(2022, 5, 1), user_id=7)
+        for data in ({'posts': [row, {'id': 2}], 'missing': [3]}, {'posts': None, 'missing': []}, {'posts': row}):
+            assert compile_model(blogpost_batch_model)(data) == marshal(data, blogpost_batch_model)
@@ -0,0 +1,51 @@
+import unittest, json, os, tempfile
+from .. import create_app
+from app.models import db
+from app.config import config_dict
+
+class TestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(config=config_dict['test'])
+        cls.directory = tempfile.TemporaryDirectory()
+        cls._ctx = cls.app.app_context()
+        cls._ctx.push()
+        db.create_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls._ctx.pop()
+        cls.directory.cleanup()
+
+    def lazy_app(self, **overrides):
+        return create_app(config=type('LazyConfig', (config_dict['test'],), dict(LAZY_STARTUP=True, **overrides)))
+
+    def test_lazy_startup_registers_namespaces_on_first_request(self):
+        app = self.lazy_app()
+        self.assertNotIn('migrate', app.extensions)
+        self.assertNotIn('post_index', app.extensions)
+        self.assertNotIn('/users/ascending_id', {rule.rule for rule in app.url_map.iter_rules()})
+
+        response = app.test_client().get('/users/ascending_id')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/users/ascending_id', {rule.rule for rule in app.url_map.iter_rules()})
+        self.assertIn('post_index', app.extensions)
+        self.assertIn('migrate', self.app.extensions)
+
+    def test_serves_precomputed_swagger_spec(self):
+        path = os.path.join(self.directory.name, 'swagger.json')
+        result = self.app.test_cli_runner().invoke(args=['swagger', 'dump', '--output', path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with open(path) as spec:
+            dumped = json.load(spec)
+        self.assertEqual(dumped, self.app.test_client().get('/swagger.json').json)
+
+        dumped['info']['title'] = 'Precomputed'
+        with open(path, 'w') as spec:
+            json.dump(dumped, spec)
+        app = self.lazy_app(SWAGGER_SPEC_PATH=path)
+        served = app.test_client().get('/swagger.json').json
+        self.assertEqual(served, dumped)
+        self.assertNotIn('post_index', app.extensions)
@@ -0,0 +1,69 @@
+import unittest, random
+from data_structures import binary_search_tree
+
+
+def check_avl(node):
+    if node is None:
+        return 0
+    left = check_avl(node.left)
+    right = check_avl(node.right)
+    assert abs(left - right) <= 1
+    assert node.height == 1 + max(left, right)
+    return node.height
+
+class TestCase(unittest.TestCase):
+
+    def test_sequential_inserts_stay_balanced(self):
+        treemap = binary_search_tree.TreeMap()
+        for key in range(1, 1025):
+            treemap[key] = binary_search_tree.Blogpost(key, f'title {key}', 'body')
+
+        assert len(treemap) == 1024
+        assert check_avl(treemap.root) == 11
+        assert [key for key, _ in treemap] == list(range(1, 1025))
+        assert treemap.search(512).value.title == 'title 512'
+        assert treemap[2000] is None
+
+    def test_random_insert_delete(self):
+        rng = random.Random(7)
+        treemap = binary_search_tree.TreeMap()
+        expected = {}
+        for _ in range(3000):
+            key = rng.randint(0, 500)
+            if rng.random() < 0.6:
+                treemap[key] = key * 2
+                expected[key] = key * 2
+            else:
+                assert treemap.remove(key) == (key in expected)
+                expected.pop(key, None)
+            check_avl(treemap.root)
+
+        assert list(treemap) == sorted(expected.items())
+        assert len(treemap) == len(expected)
+        with self.assertRaises(KeyError):
+            del treemap[1000]
+
+    def test_range_floor_ceiling_nearest(self):
+        rng = random.Random(11)
+        keys = sorted(rng.sample(range(0, 10000), 800))
+        treemap = binary_search_tree.TreeMap()
+        for key in rng.sample(keys, len(keys)):
+            treemap[key] = str(key)
+
+        for _ in range(200):
+            lo, hi = sorted(rng.sample(range(-100, 10100), 2))
+            assert list(treemap.range(lo, hi)) == [(key, str(key)) for key in keys if lo <= key < hi]
+            probe = rng.randint(-100, 10100)
+            below = [key for key in keys if key <= probe]
+            above = [key for key in keys if key >= probe]
+            assert treemap.floor(probe) == ((below[-1], str(below[-1])) if below else None)
+            assert treemap.ceiling(probe) == ((above[0], str(above[0])) if above else None)
+            closest = min(keys, key=lambda key: (abs(key - probe), key))
+            assert treemap.nearest(probe) == (closest, str(closest))
+
+        assert list(treemap.range()) == list(treemap)
+        assert list(treemap.range(hi=keys[3])) == [(key, str(key)) for key in keys[:3]]
+        assert list(treemap.range(keys[-1] + 1)) == []
+        assert list(reversed(treemap)) == list(treemap)[::-1]
+        assert list(treemap.keys()) == keys
+        assert binary_search_tree.TreeMap().nearest(5) is None
@@ -0,0 +1,23 @@
+import unittest, time
+from data_structures.ttl_cache import TTLCache
+
+class TestCase(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set(1, "one")
+        cache.set(2, "two")
+        cache.get(1)
+        cache.set(3, "three")
+
+        assert cache.get(1) == "one"
+        assert cache.get(2) is None
+        assert len(cache) == 2
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=10, ttl=0.01)
+        cache.set(1, "one")
+        time.sleep(0.02)
+
+        assert cache.get(1) is None
+        assert cache.pop(1) is None
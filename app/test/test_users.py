@@ -1,8 +1,10 @@
-import unittest
+import unittest, json
 from .. import create_app
 from app.models import db, User
 from app.config import config_dict
-from werkzeug.security import check_password_hash
+from app.hashing import PasswordHasher
+from app.query_budget import QueryBudgetExceeded, query_budget
+from werkzeug.security import check_password_hash, generate_password_hash
 
 class TestCase(unittest.TestCase):
     @classmethod
@@ -61,4 +63,120 @@ class TestCase(unittest.TestCase):
         }
         response = self.client.post('/auth/login', json=data)
 
-        assert response.status_code == 200
\ No newline at end of file
+        assert response.status_code == 200
+
+    def test_stream_users(self):
+        for i in range(3):
+            data = {
+                "name": f"streamuser{i}",
+                "email": f"streamuser{i}@company.com",
+                "password": "password",
+                "address": "testaddress",
+                "phone": "XXXXXXXXXX"
+            }
+            self.client.post('/users', json=data)
+
+        buffered = self.client.get('/users/ascending_id').json
+        response = self.client.get('/users/ascending_id', headers={"Accept": "application/x-ndjson"})
+        streamed = [json.loads(line) for line in response.text.splitlines()]
+
+        assert response.mimetype == "application/x-ndjson"
+        assert streamed == buffered
+
+        response = self.client.get('/users/descending_id?stream=json')
+        assert [user["id"] for user in response.json] == sorted((user["id"] for user in buffered), reverse=True)
+
+    def test_login_rehashes_outdated_hash(self):
+        data = {
+            "name": "rehashuser",
+            "email": "rehashuser@company.com",
+            "password": "password",
+            "address": "testaddress",
+            "phone": "XXXXXXXXXX"
+        }
+        self.client.post('/users', json=data)
+        user = User.query.filter_by(email="rehashuser@company.com").first()
+        user.password_hash = generate_password_hash("password", "pbkdf2:sha256:500")
+        db.session.commit()
+
+        response = self.client.post('/auth/login', json={"email": "rehashuser@company.com", "password": "password"})
+        user = User.query.filter_by(email="rehashuser@company.com").first()
+
+        assert response.status_code == 200
+        assert user.password_hash.startswith(self.app.config['PASSWORD_HASH_METHOD'] + '$')
+        assert check_password_hash(user.password_hash, "password")
+
+    def test_process_pool_hasher(self):
+        hasher = PasswordHasher({'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000', 'PASSWORD_HASH_WORKERS': 1})
+        try:
+            pwhash = hasher.generate("password")
+            assert hasher.check(pwhash, "password")
+            assert not hasher.check(pwhash, "wrong")
+            assert not hasher.needs_rehash(pwhash)
+        finally:
+            hasher.shutdown()
+
+    def test_bulk_create_users(self):
+        rows = [
+            {"name": "bulk0", "email": "bulk0@company.com", "password": "password"},
+            {"name": "bulk1", "email": "bulk1@company.com"},
+            {"name": "bulk2", "email": "bulk2@company.com", "password": "password"}
+        ]
+        response = self.client.post('/users/bulk?batch_size=2', json=rows)
+
+        assert response.status_code == 200
+        assert response.json["created"] == 2
+        assert [result["status"] for result in response.json["results"]] == ["created", "failed", "created"]
+        assert check_password_hash(User.query.filter_by(email="bulk2@company.com").first().password_hash, "password")
+
+        ndjson = json.dumps({"name": "bulk3", "email": "bulk3@company.com", "password": "password"}) + "\nnot json\n"
+        response = self.client.post('/users/bulk', data=ndjson, content_type="application/x-ndjson")
+
+        assert response.json["created"] == 1
+        assert response.json["results"][1]["error"] == "Row is not a JSON object"
+
+    def test_metrics_endpoint(self):
+        self.client.post('/users', json={"name": "metrics", "email": "metrics@company.com", "password": "password"})
+        self.client.get('/users/ascending_id')
+
+        response = self.client.get('/metrics')
+        lines = response.text.splitlines()
+
+        assert response.status_code == 200
+        assert 'flaskapi_request_duration_seconds_count{endpoint="/users/ascending_id",method="GET",status="200"} 1' in lines
+        statements = next(line for line in lines if line.startswith('flaskapi_sql_statements_total{endpoint="/users/ascending_id"'))
+        rows = next(line for line in lines if line.startswith('flaskapi_rows_fetched_total{endpoint="/users/ascending_id"'))
+        # the users change counter, then the listing itself
+        assert int(statements.split()[-1]) == 2
+        assert int(rows.split()[-1]) == User.query.count() + 1
+
+    def test_users_listing_conditional_get(self):
+        self.client.post('/users', json={"name": "etag", "email": "etag1@company.com", "password": "password"})
+        response = self.client.get('/users/ascending_id')
+        etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+
+        assert self.client.get('/users/ascending_id', headers={'If-None-Match': etag}).status_code == 304
+        assert self.client.get('/users/ascending_id', headers={'If-Modified-Since': last_modified}).status_code == 304
+        assert self.client.get('/users/ascending_id?stream=ndjson', headers={'If-None-Match': etag}).status_code == 200
+
+        self.client.post('/users', json={"name": "etag", "email": "etag2@company.com", "password": "password"})
+        response = self.client.get('/users/ascending_id', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json[-1]["email"] == "etag2@company.com"
+
+    def test_query_budget_raises_in_tests(self):
+        for i in range(2):
+            self.client.post('/users', json={"name": "budget", "email": f"budget{i}@company.com", "password": "password"})
+
+        @query_budget(max_statements=1, max_rows=1)
+        def load_every_user():
+            return User.query.all()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            load_every_user()
+
+        @query_budget(max_statements=1, max_rows=1)
+        def load_one_user():
+            return User.query.first()
+
+        assert load_one_user() is not None
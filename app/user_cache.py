@@ -0,0 +1,44 @@
+from flask import current_app
+from app.models import User
+from data_structures.ttl_cache import TTLCache
+
+
+class CurrentUser:
+    """The parts of a user that authenticated handlers need, detached from the session."""
+
+    def __init__(self, id, email, name=None):
+        self.id = id
+        self.email = email
+        self.name = name
+
+
+def token_claims(user_id):
+    return {'user_id': user_id}
+
+
+def get_user_cache():
+    return current_app.extensions['user_cache']
+
+
+def load_user(jwt_header, jwt_data):
+    user_id = jwt_data.get('user_id')
+    cache = get_user_cache()
+    if user_id is not None:
+        cached = cache.get(user_id)
+        if cached is not None:
+            return cached
+        user = User.query.get(user_id)
+    else:
+        # tokens issued before the user_id claim only carry the email
+        user = User.query.filter_by(email=jwt_data['sub']).first()
+
+    if user is None:
+        return None
+    cached = CurrentUser(user.id, user.email, user.name)
+    cache.set(user.id, cached)
+    return cached
+
+
+def init_app(app, jwt):
+    app.extensions['user_cache'] = TTLCache(app.config.get('USER_CACHE_SIZE', 10000), app.config.get('USER_CACHE_TTL', 300))
+    jwt.user_lookup_loader(load_user)
@@ -0,0 +1,139 @@
+"""Compare the ASGI read entry point with the WSGI app under concurrent slow I/O.
+
+    python -m benchmarks.bench_async [--concurrency 8,64,256] [--threads 8] [--latency-ms 20]
+
+Both apps serve the same seeded SQLite file. Every SQL statement is held
+for --latency-ms inside the SQLite driver thread (a trace callback), which
+stands in for a network round trip to the database: the WSGI app blocks one
+of its --threads worker threads for it, the ASGI app only parks a
+coroutine. Requests alternate between bulkFetch pages and single-post GETs,
+with at most --concurrency of them in flight.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_config
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import await_only
+
+from app import create_app
+from app.asgi import AsyncReadApp
+from app.models import db
+from benchmarks.suite import seed_database, user_email
+
+
+def asgi_get(asgi, path, headers):
+    async def call():
+        status = None
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'http_version': '1.1',
+            'scheme': 'http', 'server': ('localhost', 80),
+            'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        }
+        await asgi(scope, receive, send)
+        return status
+    return call()
+
+
+async def drive(call, paths, concurrency):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(path, headers):
+        async with gate:
+            start = time.perf_counter()
+            status = await call(path, headers)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f'{path} -> {status}')
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(path, headers) for path, headers in paths))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(paths) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=512)
+    parser.add_argument('--concurrency', default='8,64,256')
+    parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads, as in gunicorn --threads')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='simulated round trip per SQL statement')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_async.db')
+    app = create_app(make_config(path))
+    seed_database(app, args.users, args.posts, 5, args.seed)
+    tokens = app.test_client().post('/auth/login', json={'email': user_email(app, 1), 'password': 'password1'}).json
+    auth = {'Authorization': f"Bearer {tokens['access_token']}"}
+
+    latency = args.latency_ms / 1000
+    rng = random.Random(args.seed)
+    paths = [
+        ('/blog_posts/bulkFetch', dict(auth, Limit='20')) if i % 2 else (f'/blog_posts/{rng.randint(1, args.posts)}', auth)
+        for i in range(args.requests)
+    ]
+
+    def slow_statements(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(lambda statement: time.sleep(latency))
+
+    def slow_async_statements(dbapi_connection, connection_record):
+        # the callback runs on aiosqlite's connection thread, not the event loop
+        await_only(dbapi_connection._connection.set_trace_callback(lambda statement: time.sleep(latency)))
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', slow_statements)
+    pool = ThreadPoolExecutor(max_workers=args.threads)
+    clients = threading.local()
+
+    def wsgi_get(path, headers):
+        if not hasattr(clients, 'client'):
+            clients.client = app.test_client()
+        return clients.client.get(path, headers=headers).status_code
+
+    async def run_wsgi(concurrency):
+        loop = asyncio.get_running_loop()
+        return await drive(lambda path, headers: loop.run_in_executor(pool, wsgi_get, path, headers), paths, concurrency)
+
+    async def run_asgi(concurrency):
+        # SQLite files default to NullPool, which would start an aiosqlite
+        # thread per request; a server database gets a pool anyway
+        asgi = AsyncReadApp(app, poolclass=AsyncAdaptedQueuePool, pool_size=concurrency, max_overflow=0)
+        event.listen(asgi.get_engine().sync_engine, 'connect', slow_async_statements)
+        try:
+            return await drive(lambda path, headers: asgi_get(asgi, path, headers), paths, concurrency)
+        finally:
+            await asgi.engine.dispose()
+
+    print(f'requests={args.requests} latency={args.latency_ms}ms/statement wsgi threads={args.threads}')
+    print(f"{'concurrency':>11} {'app':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for concurrency in (int(level) for level in args.concurrency.split(',')):
+        for name, run in (('wsgi', run_wsgi), ('asgi', run_asgi)):
+            throughput, p50, p95 = asyncio.run(run(concurrency))
+            print(f'{concurrency:>11} {name:>5} {throughput:>9.1f} {p50 * 1000:>9.1f} {p95 * 1000:>9.1f}')
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
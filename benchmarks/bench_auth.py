@@ -0,0 +1,69 @@
+"""Login throughput with password hashing inline vs in the hashing process pool.
+
+    python -m benchmarks.bench_auth [--threads 8] [--logins 5] [--method pbkdf2:sha256]
+
+While the login burst runs, a probe thread keeps calling a cheap endpoint to
+show how much the burst delays unrelated requests on the same worker.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks.common import make_app, signup
+
+
+def run(app, threads, logins):
+    client = app.test_client()
+    signup(client)
+    credentials = {'email': 'bench@example.com', 'password': 'password'}
+
+    def login_burst():
+        local_client = app.test_client()
+        for _ in range(logins):
+            assert local_client.post('/auth/login', json=credentials).status_code == 200
+
+    probe_latencies = []
+    done = threading.Event()
+
+    def probe():
+        local_client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            local_client.get('/blog_posts/index_stats')
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    workers = [threading.Thread(target=login_burst) for _ in range(threads)]
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    app.extensions['password_hasher'].shutdown()
+    return threads * logins / elapsed, statistics.median(probe_latencies), max(probe_latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=5)
+    parser.add_argument('--method', default='pbkdf2:sha256')
+    parser.add_argument('--pool-workers', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'logins/s':>10} {'probe p50 ms':>13} {'probe max ms':>13}")
+    for name, workers in (('inline', 0), ('pool', args.pool_workers)):
+        app = make_app(PASSWORD_HASH_METHOD=args.method, PASSWORD_HASH_WORKERS=workers)
+        throughput, p50, worst = run(app, args.threads, args.logins)
+        print(f"{name:>8} {throughput:>10.1f} {p50 * 1000:>13.2f} {worst * 1000:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
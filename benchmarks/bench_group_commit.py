@@ -0,0 +1,63 @@
+"""POST /blog_posts/users/ throughput with per-request commits vs group commit.
+
+    python -m benchmarks.bench_group_commit [--threads 1,8,32] [--posts 20] [--fsync-ms 5]
+
+Every COMMIT is held for --fsync-ms before it reaches SQLite, standing in
+for the fsync of a durable commit on a server database. Each of --threads
+clients creates --posts posts back to back.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.common import make_app, signup
+from sqlalchemy import event
+
+from app.models import db
+
+
+def run(app, threads, posts, fsync):
+    client = app.test_client()
+    headers = signup(client, email=f'group{threads}@example.com')
+
+    def writer(i):
+        local_client = app.test_client()
+        for j in range(posts):
+            response = local_client.post('/blog_posts/users/', json={'title': f'{i}-{j}', 'body': 'group commit'}, headers=headers)
+            assert response.status_code == 201, response.json
+
+    with app.app_context():
+        event.listen(db.engine, 'commit', lambda conn: time.sleep(fsync))
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * posts / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='1,8,32')
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--fsync-ms', type=float, default=5.0)
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f'fsync={args.fsync_ms}ms posts/thread={args.posts} group window={args.window_ms}ms')
+    print(f"{'threads':>8} {'per-request/s':>14} {'group/s':>10} {'batches':>8}")
+    for threads in (int(level) for level in args.threads.split(',')):
+        path = os.path.join(tempfile.mkdtemp(), 'bench_group_commit.db')
+        plain = run(make_app(path), threads, args.posts, args.fsync_ms / 1000)
+        path = os.path.join(tempfile.mkdtemp(), 'bench_group_commit.db')
+        app = make_app(path, GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=args.window_ms,
+                       GROUP_COMMIT_MAX_BATCH=threads)
+        grouped = run(app, threads, args.posts, args.fsync_ms / 1000)
+        print(f'{threads:>8} {plain:>14.1f} {grouped:>10.1f} {app.extensions["group_committer"].batches:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Micro-benchmark HashTable against the built-in dict.
+
+    python -m benchmarks.bench_hash_table [--sizes 1000,100000]
+"""
+import argparse
+import time
+
+from data_structures import hash_table
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(keys, add, get, remove):
+    return {
+        'insert': timed(lambda: [add(key, key) for key in keys]),
+        'lookup': timed(lambda: [get(key) for key in keys]),
+        'delete': timed(lambda: [remove(key) for key in keys]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000')
+    args = parser.parse_args()
+
+    print(f"{'n':>8} {'impl':>10} {'insert ns/op':>13} {'lookup ns/op':>13} {'delete ns/op':>13}")
+    for n in (int(size) for size in args.sizes.split(',')):
+        keys = [f'key-{i}' for i in range(n)]
+
+        ht = hash_table.HashTable()
+        table_result = run(keys, ht.add_key_value, ht.get_value, ht.delete_key)
+        d = {}
+        dict_result = run(keys, d.__setitem__, d.get, d.pop)
+
+        for name, result in (('HashTable', table_result), ('dict', dict_result)):
+            print(f"{n:>8} {name:>10}" + ''.join(f" {result[op] / n * 1e9:>13.1f}" for op in ('insert', 'lookup', 'delete')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Per-request peak memory of the listing and lookup endpoints, and bytes per node.
+
+    python -m benchmarks.bench_memory [--users 2000] [--posts 5000] [--nodes 100000]
+
+Peaks are measured with tracemalloc around a single request (after one
+warm-up call), relative to what was allocated before it. The node table
+allocates --nodes instances of every data_structures node class and of a
+twin of it without __slots__, i.e. the representation before the change.
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+from datetime import date
+
+from benchmarks.common import make_config
+from app import create_app
+from benchmarks.suite import seed_database, user_email
+from data_structures import binary_search_tree, custom_queue, hash_table, linked_list, stack
+
+NODE_CLASSES = {
+    'binary_search_tree.BSTnode': (binary_search_tree.BSTnode, lambda i: (i, None)),
+    'binary_search_tree.Blogpost': (binary_search_tree.Blogpost,
+                                    lambda i: (i, 'title', 'body', date(2022, 1, 1), 1, 1, None)),
+    'linked_list.Node': (linked_list.Node, lambda i: (i, None)),
+    'stack.Node': (stack.Node, lambda i: (i, None)),
+    'custom_queue.Node': (custom_queue.Node, lambda i: (i, None)),
+    'hash_table.Data': (hash_table.Data, lambda i: (i, None, i)),
+}
+
+
+def allocated(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+def request_peak(call):
+    call()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call()
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--nodes', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'node class':<30} {'slots B/node':>12} {'dict B/node':>12}")
+    for name, (cls, make_args) in NODE_CLASSES.items():
+        plain = type(cls.__name__, (), {'__init__': cls.__init__})
+        slotted = allocated(lambda: [cls(*make_args(i)) for i in range(args.nodes)])
+        unslotted = allocated(lambda: [plain(*make_args(i)) for i in range(args.nodes)])
+        print(f'{name:<30} {slotted / args.nodes:>12.1f} {unslotted / args.nodes:>12.1f}')
+
+    app = create_app(make_config(os.path.join(tempfile.mkdtemp(), 'bench_memory.db')))
+    seed_database(app, args.users, args.posts, 5, args.seed)
+    client = app.test_client()
+    tokens = client.post('/auth/login', json={'email': user_email(app, 1), 'password': 'password1'}).json
+    auth = {'Authorization': f"Bearer {tokens['access_token']}"}
+    ids = ','.join(str(post_id) for post_id in range(1, args.posts + 1, max(1, args.posts // 200)))
+    endpoints = {
+        'users.list_ascending': ('/users/ascending_id', {}),
+        'users.list_descending': ('/users/descending_id', {}),
+        'blog_posts.bulk_fetch_500': ('/blog_posts/bulkFetch', dict(auth, Limit='500')),
+        'blog_posts.get_one': (f'/blog_posts/{args.posts // 2}', auth),
+        'blog_posts.batch_200': (f'/blog_posts/batch?ids={ids}', auth),
+        'blog_posts.range_ids_500': ('/blog_posts/range/ids?start=1&limit=500', auth),
+    }
+
+    print(f"\n{'endpoint':<30} {'peak KiB':>10}")
+    for name, (path, headers) in endpoints.items():
+        def call():
+            response = client.get(path, headers=headers)
+            assert response.status_code == 200, (path, response.status_code)
+        print(f'{name:<30} {request_peak(call) / 1024:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Compare bulkFetch title search through the trigram index with the LIKE scan.
+
+    python -m benchmarks.bench_search [--posts 100000] [--queries 200]
+
+Both paths run against an on-disk SQLite copy of the blog_posts table; the
+index path resolves ids in memory and then fetches one page by primary key.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, desc, select
+
+from app.models import BlogPost, User, db
+from data_structures import search_index
+
+WORDS = ('flask', 'python', 'query', 'index', 'cursor', 'search', 'tree', 'cache',
+         'worker', 'stream', 'batch', 'async', 'replica', 'token', 'session', 'engine',
+         'model', 'router', 'schema', 'latency', 'memory', 'commit', 'pool', 'trigram')
+
+
+def populate(engine, posts, rng):
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{'id': 1, 'name': 'bench', 'password_hash': 'x'}])
+        rows = [
+            {'id': i, 'title': ' '.join(rng.choice(WORDS) for _ in range(5)).capitalize(), 'body': '', 'user_id': 1}
+            for i in range(1, posts + 1)
+        ]
+        conn.execute(BlogPost.__table__.insert(), rows)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    path = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+    engine = create_engine(f'sqlite:///{path}')
+    rows = populate(engine, args.posts, rng)
+
+    start = time.perf_counter()
+    index = search_index.SearchIndex()
+    for row in rows:
+        index.add(row['id'], row['title'])
+    build = time.perf_counter() - start
+
+    queries = [rng.choice(WORDS)[1:5] + ' ' + rng.choice(WORDS)[:3] for _ in range(args.queries)]
+    table = BlogPost.__table__
+
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        for query in queries:
+            conn.execute(
+                select(table).where(table.c.title.contains(query)).order_by(desc(table.c.id)).limit(args.limit)
+            ).all()
+        like = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            post_ids = index.search(query)[:args.limit]
+            conn.execute(
+                select(table).where(table.c.id.in_(post_ids)).order_by(desc(table.c.id))
+            ).all()
+        indexed = time.perf_counter() - start
+
+    print(f'posts={args.posts} queries={args.queries} index build={build:.2f}s')
+    print(f"{'LIKE scan':>12}: {like / args.queries * 1000:8.3f} ms/query")
+    print(f"{'trigram':>12}: {indexed / args.queries * 1000:8.3f} ms/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Compare the compiled serializer with flask_restx marshal for bulkFetch pages.
+
+    python -m benchmarks.bench_serializer [--rows 50,1000,10000] [--repeat 20]
+
+Rows come from the bulkFetch join against an on-disk SQLite database, so
+both paths see the same SQLAlchemy Row objects. The marshal path is
+marshal_with + json.dumps, as flask_restx renders it; the compiled path is
+the serializer serialize_with uses, encoded with orjson when installed.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.common import make_app
+from flask_restx import marshal
+from sqlalchemy import desc
+
+from app.models import BlogPost, User, db
+from app.routers.blog_posts import blogpost_detailed_model
+from app.serializer import compile_model, dumps
+
+
+def populate(rows, rng):
+    db.session.execute(User.__table__.insert(), [
+        {'id': i, 'name': f'user {i}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+         'address': f'{i} Bench Street', 'phone': f'{i:010d}'}
+        for i in range(1, 101)
+    ])
+    db.session.execute(BlogPost.__table__.insert(), [
+        {'id': i, 'title': f'Post {i}', 'body': 'lorem ipsum ' * 20, 'date': date(2022, 1, 1 + i % 28),
+         'user_id': rng.randint(1, 100)}
+        for i in range(1, rows + 1)
+    ])
+    db.session.commit()
+
+
+def bulk_fetch_rows(limit):
+    return BlogPost.query.join(User, User.id == BlogPost.user_id).\
+        add_columns(BlogPost.id.label('post_id'), BlogPost.title, BlogPost.body, BlogPost.date, User.id, User.name, User.email, User.address, User.phone).\
+        order_by(desc(BlogPost.id)).limit(limit).all()
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='50,1000,10000')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.rows.split(',')]
+
+    app = make_app(os.path.join(tempfile.mkdtemp(), 'bench_serializer.db'))
+    serialize = compile_model(blogpost_detailed_model)
+    with app.app_context():
+        populate(max(sizes), random.Random(args.seed))
+
+        print(f"{'rows':>8} {'marshal ms':>12} {'compiled ms':>12} {'speedup':>8}")
+        for size in sizes:
+            rows = bulk_fetch_rows(size)
+            assert json.loads(dumps(serialize(rows))) == json.loads(json.dumps(marshal(rows, blogpost_detailed_model)))
+            marshalled = timed(lambda: json.dumps(marshal(rows, blogpost_detailed_model)), args.repeat)
+            compiled = timed(lambda: dumps(serialize(rows)), args.repeat)
+            print(f'{size:>8} {marshalled * 1000:>12.3f} {compiled * 1000:>12.3f} {marshalled / compiled:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
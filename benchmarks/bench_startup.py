@@ -0,0 +1,74 @@
+"""Measure worker cold start: importing the app, create_app() and the first requests.
+
+    python -m benchmarks.bench_startup [--runs 10]
+
+Every run is a fresh interpreter, as a new worker would be. Modes:
+eager (the default startup), lazy (LAZY_STARTUP) and lazy+spec
+(LAZY_STARTUP with a SWAGGER_SPEC_PATH written by `flask swagger dump`).
+The first requests are a GET of /swagger.json, then one of /users/ascending_id.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import make_app
+from app.startup import generate_spec
+
+WORKER = '''
+import json, time
+start = time.perf_counter()
+from app import create_app
+from app.config import TestConfig
+imported = time.perf_counter()
+TestConfig.SQLALCHEMY_DATABASE_URI = {uri!r}
+TestConfig.SQLALCHEMY_ECHO = False
+app = create_app(TestConfig)
+created = time.perf_counter()
+client = app.test_client()
+assert client.get('/swagger.json').status_code == 200
+spec = time.perf_counter()
+assert client.get('/users/ascending_id').status_code == 200
+listed = time.perf_counter()
+print(json.dumps([imported - start, created - imported, spec - created, listed - spec]))
+'''
+
+
+def run_worker(uri, env):
+    output = subprocess.run([sys.executable, '-c', WORKER.format(uri=uri)], env=env, check=True,
+                            capture_output=True, text=True, cwd=os.getcwd()).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench_startup.db')
+    app = make_app(path)
+    spec_path = os.path.join(directory, 'swagger.json')
+    with open(spec_path, 'w') as spec:
+        json.dump(generate_spec(app), spec)
+
+    modes = {
+        'eager': {'LAZY_STARTUP': 'False'},
+        'lazy': {'LAZY_STARTUP': 'True'},
+        'lazy+spec': {'LAZY_STARTUP': 'True', 'SWAGGER_SPEC_PATH': spec_path},
+    }
+    print(f'median of {args.runs} fresh interpreters, ms')
+    print(f"{'mode':>10} {'import':>8} {'create':>8} {'swagger':>8} {'users':>8} {'total':>8}")
+    for name, overrides in modes.items():
+        env = {key: value for key, value in os.environ.items() if key not in ('LAZY_STARTUP', 'SWAGGER_SPEC_PATH')}
+        env.update(overrides)
+        runs = [run_worker(f'sqlite:///{path}', env) for _ in range(args.runs)]
+        medians = [statistics.median(column) * 1000 for column in zip(*runs)]
+        print(f'{name:>10} ' + ' '.join(f'{value:>8.1f}' for value in medians) + f' {sum(medians):>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Compare the AVL TreeMap with the rebuild-on-every-insert TreeMap it replaced.
+
+    python -m benchmarks.bench_treemap [--sizes 1000,10000,100000] [--legacy-max 10000]
+
+The legacy tree is O(n^2 log n) to load, so sizes above --legacy-max are
+reported as skipped for it.
+"""
+import argparse
+import random
+import time
+
+from data_structures import binary_search_tree
+
+
+class LegacyBSTnode:
+    def __init__(self, key, value=None):
+        self.key = key
+        self.value = value
+        self.left = None
+        self.right = None
+        self.parent = None
+
+
+def legacy_insert(node, key, value):
+    if node is None:
+        node = LegacyBSTnode(key, value)
+    elif key < node.key:
+        node.left = legacy_insert(node.left, key, value)
+        node.left.parent = node
+    elif key > node.key:
+        node.right = legacy_insert(node.right, key, value)
+        node.right.parent = node
+    return node
+
+
+def legacy_find(node, key):
+    if node is None:
+        return None
+    if key == node.key:
+        return node
+    if key < node.key:
+        return legacy_find(node.left, key)
+    return legacy_find(node.right, key)
+
+
+def legacy_list_all(node):
+    if node is None:
+        return []
+    return legacy_list_all(node.left) + [(node.key, node.value)] + legacy_list_all(node.right)
+
+
+def legacy_make_balanced_bst(data, lo=0, hi=None, parent=None):
+    if hi is None:
+        hi = len(data) - 1
+    if lo > hi:
+        return None
+    mid = (lo + hi) // 2
+    key, value = data[mid]
+    root = LegacyBSTnode(key, value)
+    root.parent = parent
+    root.left = legacy_make_balanced_bst(data, lo, mid - 1, root)
+    root.right = legacy_make_balanced_bst(data, mid + 1, hi, root)
+    return root
+
+
+class LegacyTreeMap:
+    def __init__(self):
+        self.root = None
+
+    def __setitem__(self, key, value):
+        node = legacy_find(self.root, key)
+        if not node:
+            self.root = legacy_insert(self.root, key, value)
+            self.root = legacy_make_balanced_bst(legacy_list_all(self.root))
+        else:
+            node.value = value
+
+    def __iter__(self):
+        return (x for x in legacy_list_all(self.root))
+
+    def search(self, key):
+        return legacy_find(self.root, key)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(treemap_cls, keys, lookups):
+    treemap = treemap_cls()
+
+    def load():
+        for key in keys:
+            treemap[key] = key
+
+    def lookup():
+        for key in lookups:
+            treemap.search(key)
+
+    def iterate():
+        for _ in treemap:
+            pass
+
+    return {'insert': timed(load), 'search': timed(lookup), 'iterate': timed(iterate)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--legacy-max', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'n':>8} {'impl':>7} {'insert s':>10} {'search s':>10} {'iterate s':>10}")
+    for n in (int(size) for size in args.sizes.split(',')):
+        # post ids arrive in ascending order from the table scan
+        keys = list(range(1, n + 1))
+        lookups = [rng.randint(1, n) for _ in range(10000)]
+        for name, cls in (('avl', binary_search_tree.TreeMap), ('legacy', LegacyTreeMap)):
+            if cls is LegacyTreeMap and n > args.legacy_max:
+                print(f"{n:>8} {name:>7} {'skipped':>10}")
+                continue
+            result = run(cls, keys, lookups)
+            print(f"{n:>8} {name:>7} {result['insert']:>10.4f} {result['search']:>10.4f} {result['iterate']:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
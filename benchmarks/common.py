@@ -0,0 +1,37 @@
+"""Shared helpers for benchmarks that drive the Flask app against SQLite."""
+import os
+import tempfile
+
+# config.py reads these at import time; benchmarks never talk to the real DB
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-jwt-secret-key-0123456789abcdef')
+os.environ.setdefault('DEBUG', 'False')
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite://')
+
+from app import create_app  # noqa: E402
+from app.config import TestConfig  # noqa: E402
+from app.models import db  # noqa: E402
+
+
+def make_config(path=None, **overrides):
+    path = path or os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    attrs = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_ECHO': False,
+    }
+    attrs.update(overrides)
+    return type('BenchmarkConfig', (TestConfig,), attrs)
+
+
+def make_app(path=None, **overrides):
+    app = create_app(make_config(path, **overrides))
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def signup(client, email='bench@example.com', password='password'):
+    client.post('/users', json={
+        'name': 'bench', 'email': email, 'password': password, 'address': 'bench', 'phone': '0000000000'
+    })
+    response = client.post('/auth/login', json={'email': email, 'password': password})
+    return {'Authorization': f"Bearer {response.json['access_token']}"}
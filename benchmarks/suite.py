@@ -0,0 +1,298 @@
+"""Benchmark every route and the data_structures hot paths, with regression checks.
+
+    python -m benchmarks.suite --users 500 --posts 5000 --output results.json
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+
+Routes are driven through create_app(...).test_client() against a seeded
+SQLite database; each benchmark reports the median and p95 seconds per
+call. Timings only compare on the machine that recorded them, so no
+baseline is shipped or checked by default: record one with --save-baseline
+(benchmarks/baseline.json unless --baseline says otherwise) on the runner,
+then pass --baseline to check it. The check compares each benchmark's
+25th percentile, which short noisy stretches on a shared machine barely
+move. A benchmark slower than the baseline's by more than --threshold (a
+fraction) is rerun up to --confirm times, keeping its fastest run, and the
+suite exits non-zero only if it is still over.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.common import make_config
+from app import create_app
+from app.models import BlogPost, User, db
+from data_structures import binary_search_tree, custom_queue, hash_table, linked_list, stack
+from generate_dummy_data import chunks, generate_posts, generate_users, shared_password_hashes
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+class Benchmark:
+    def __init__(self, name, call, setup=None):
+        self.name = name
+        self.call = call
+        self.setup = setup
+
+    def run(self, repeat):
+        timings = []
+        for i in range(repeat + 1):
+            state = self.setup() if self.setup else None
+            start = time.perf_counter()
+            self.call(state) if self.setup else self.call()
+            elapsed = time.perf_counter() - start
+            if i:  # the first call only warms caches
+                timings.append(elapsed)
+        timings.sort()
+        return {
+            'median_s': statistics.median(timings),
+            'min_s': timings[0],
+            'p25_s': timings[len(timings) // 4],
+            'p95_s': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            'runs': len(timings)
+        }
+
+
+def seed_database(app, users, posts, body_sentences, seed):
+    password_hashes = shared_password_hashes(seed, 16, 1000)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            for task in chunks(seed, users, 2000):
+                connection.execute(User.__table__.insert(), generate_users(task + (password_hashes,)))
+            for task in chunks(seed, posts, 2000):
+                connection.execute(BlogPost.__table__.insert(), generate_posts(task + (users, body_sentences)))
+
+
+def expect(response, *codes):
+    if response.status_code not in codes:
+        raise RuntimeError(f'{response.request.method} {response.request.path} -> {response.status_code}: {response.data[:200]}')
+    return response
+
+
+def endpoint_benchmarks(app, users, posts, seed):
+    client = app.test_client()
+    rng = random.Random(seed)
+    tokens = expect(client.post('/auth/login', json={'email': user_email(app, 1), 'password': 'password1'}), 200).json
+    auth = {'Authorization': f"Bearer {tokens['access_token']}"}
+    refresh = {'Authorization': f"Bearer {tokens['refresh_token']}"}
+    owner_id = 1
+    counter = iter(range(10 ** 9))
+
+    def random_post():
+        return rng.randint(1, posts)
+
+    def create_post(state=None):
+        return expect(client.post('/blog_posts/users/', json={'title': 'Bench title', 'body': 'Bench body'}, headers=auth), 201).json['id']
+
+    def create_user():
+        with app.app_context():
+            user = User(name='bench', email=f'bench{next(counter)}@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    def create_posts(count):
+        with app.app_context():
+            db.session.add_all(BlogPost(title='Bench', body='Bench', user_id=owner_id) for _ in range(count))
+            db.session.commit()
+
+    def not_modified(name, path, headers=None):
+        # the ETag is read before every run, earlier benchmarks write to the tables
+        def setup():
+            etag = expect(client.get(path, headers=headers), 200).headers['ETag']
+            return dict(headers or {}, **{'If-None-Match': etag})
+        return Benchmark(name, lambda conditional_headers: expect(client.get(path, headers=conditional_headers), 304), setup)
+
+    return [
+        Benchmark('auth.login', lambda: expect(client.post('/auth/login', json={'email': user_email(app, 1), 'password': 'password1'}), 200)),
+        Benchmark('auth.refresh', lambda: expect(client.post('/auth/refresh', headers=refresh), 200)),
+        Benchmark('users.create', lambda: expect(client.post('/users', json={
+            'name': 'bench', 'email': f'signup{next(counter)}@example.com', 'password': 'password', 'address': '', 'phone': ''
+        }), 201)),
+        Benchmark('users.bulk_create', lambda: expect(client.post('/users/bulk', json=[
+            {'name': 'bench', 'email': f'bulk{next(counter)}@example.com', 'password': 'password'} for _ in range(50)
+        ]), 200)),
+        Benchmark('users.list_ascending', lambda: expect(client.get('/users/ascending_id'), 200)),
+        Benchmark('users.list_descending', lambda: expect(client.get('/users/descending_id'), 200)),
+        not_modified('users.list_ascending_not_modified', '/users/ascending_id'),
+        Benchmark('users.list_ascending_ndjson', lambda: expect(client.get('/users/ascending_id?stream=ndjson'), 200)),
+        Benchmark('users.get_one', lambda: expect(client.get(f'/users/{rng.randint(1, users)}'), 200)),
+        Benchmark('users.delete_one', lambda user_id: expect(client.delete(f'/users/{user_id}'), 200), setup=create_user),
+        Benchmark('blog_posts.bulk_fetch', lambda: expect(client.get('/blog_posts/bulkFetch', headers=dict(auth, Limit='50')), 200)),
+        not_modified('blog_posts.bulk_fetch_not_modified', '/blog_posts/bulkFetch', dict(auth, Limit='50')),
+        Benchmark('blog_posts.bulk_fetch_search', lambda: expect(client.get('/blog_posts/bulkFetch', headers=dict(auth, Limit='50', Search='the')), 200)),
+        Benchmark('blog_posts.bulk_remove', lambda _: expect(client.delete('/blog_posts/bulkRemove', headers=dict(auth, Limit='10')), 200),
+                  setup=lambda: create_posts(10)),
+        Benchmark('blog_posts.user_posts', lambda: expect(client.get('/blog_posts/users/', headers=auth), 200, 404)),
+        Benchmark('blog_posts.create', create_post),
+        Benchmark('blog_posts.get_one', lambda: expect(client.get(f'/blog_posts/{random_post()}', headers=auth), 200, 404)),
+        Benchmark('blog_posts.batch_get_50', lambda: expect(client.get(
+            '/blog_posts/batch?ids=' + ','.join(str(random_post()) for _ in range(50)), headers=auth), 200)),
+        Benchmark('blog_posts.range_ids', lambda: expect(client.get(
+            f'/blog_posts/range/ids?start={random_post()}&limit=50', headers=auth), 200)),
+        Benchmark('blog_posts.range_dates', lambda: expect(client.get(
+            '/blog_posts/range/dates?start=2021-01-01&end=2021-12-31&limit=50', headers=auth), 200)),
+        not_modified('blog_posts.get_one_not_modified', f'/blog_posts/{posts}', auth),
+        Benchmark('blog_posts.patch_one', lambda post_id: expect(client.patch(f'/blog_posts/{post_id}', json={'title': 'Patched', 'body': 'Patched'}, headers=auth), 200),
+                  setup=create_post),
+        Benchmark('blog_posts.delete_one', lambda post_id: expect(client.delete(f'/blog_posts/{post_id}', headers=auth), 200),
+                  setup=create_post),
+        Benchmark('blog_posts.numeric_body', lambda: expect(client.get('/blog_posts/numeric_body'), 200)),
+    ]
+
+
+def user_email(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).email
+
+
+def data_structure_benchmarks(size, seed):
+    rng = random.Random(seed)
+    keys = list(range(size))
+    lookups = [rng.randrange(size) for _ in range(size)]
+    string_keys = [f'key{key}' for key in keys]
+    treemap = binary_search_tree.TreeMap()
+    for key in keys:
+        treemap[key] = key
+    ll = linked_list.LinkedList()
+    for key in keys:
+        ll.insert_at_end({'id': key})
+    ht = hash_table.HashTable()
+    for key in string_keys:
+        ht.add_key_value(key, key)
+
+    def treemap_insert():
+        fresh = binary_search_tree.TreeMap()
+        for key in keys:
+            fresh[key] = key
+
+    def linked_list_build():
+        fresh = linked_list.LinkedList()
+        for key in keys:
+            fresh.insert_beginning({'id': key})
+        fresh.to_list()
+
+    def stack_push_pop():
+        s = stack.Stack()
+        for key in keys:
+            s.push(key)
+        while s.pop() is not None:
+            pass
+
+    def queue_enqueue_dequeue():
+        q = custom_queue.Queue()
+        for key in keys:
+            q.enqueue(key)
+        while q.dequeue() is not None:
+            pass
+
+    def hash_table_insert():
+        fresh = hash_table.HashTable()
+        for key in string_keys:
+            fresh.add_key_value(key, key)
+
+    return [
+        Benchmark('ds.treemap_insert', treemap_insert),
+        Benchmark('ds.treemap_search', lambda: [treemap.search(key) for key in lookups]),
+        Benchmark('ds.treemap_iterate', lambda: list(treemap)),
+        Benchmark('ds.linked_list_build', linked_list_build),
+        Benchmark('ds.linked_list_find', lambda: [ll.get_user_by_id(key) for key in lookups[:50]]),
+        Benchmark('ds.stack_push_pop', stack_push_pop),
+        Benchmark('ds.queue_enqueue_dequeue', queue_enqueue_dequeue),
+        Benchmark('ds.hash_table_insert', hash_table_insert),
+        Benchmark('ds.hash_table_get', lambda: [ht.get_value(key) for key in string_keys]),
+    ]
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None or 'p25_s' not in previous:
+            continue
+        ratio = result['p25_s'] / previous['p25_s'] if previous['p25_s'] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append((name, previous['p25_s'], result['p25_s'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--body-sentences', type=int, default=20)
+    parser.add_argument('--ds-size', type=int, default=10000, help='elements per data structure benchmark')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', help='run only benchmarks whose name starts with this prefix')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='baseline recorded on this machine to check against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results to --baseline (default benchmarks/baseline.json) instead of checking')
+    parser.add_argument('--threshold', type=float, default=1.0, help='allowed slowdown of the 25th percentile vs the baseline')
+    parser.add_argument('--confirm', type=int, default=3, help='reruns of a benchmark that looks slower before reporting it')
+    args = parser.parse_args()
+    if args.save_baseline:
+        args.baseline = args.baseline or DEFAULT_BASELINE
+    elif args.baseline and not os.path.exists(args.baseline):
+        parser.error(f'no baseline at {args.baseline}; record one on this machine with --save-baseline')
+
+    path = os.path.join(tempfile.mkdtemp(), 'suite.db')
+    app = create_app(make_config(path))
+    seed_database(app, args.users, args.posts, args.body_sentences, args.seed)
+
+    benchmarks = endpoint_benchmarks(app, args.users, args.posts, args.seed) + data_structure_benchmarks(args.ds_size, args.seed)
+    if args.only:
+        benchmarks = [benchmark for benchmark in benchmarks if benchmark.name.startswith(args.only)]
+
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = benchmark.run(args.repeat)
+        print(f"{benchmark.name:<36} median {results[benchmark.name]['median_s'] * 1000:9.3f} ms"
+              f"   p95 {results[benchmark.name]['p95_s'] * 1000:9.3f} ms")
+
+    report = {
+        'meta': {
+            'users': args.users, 'posts': args.posts, 'ds_size': args.ds_size, 'repeat': args.repeat,
+            'python': platform.python_version(), 'machine': platform.machine()
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return 0
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['meta'] != report['meta']:
+        print(f"warning: baseline was recorded with {baseline['meta']}")
+
+    regressions = compare(results, baseline['results'], args.threshold)
+    by_name = {benchmark.name: benchmark for benchmark in benchmarks}
+    for _ in range(args.confirm):
+        if not regressions:
+            break
+        for name, *_ in regressions:
+            rerun = by_name[name].run(args.repeat)
+            if rerun['p25_s'] < results[name]['p25_s']:
+                results[name] = rerun
+        regressions = compare(results, baseline['results'], args.threshold)
+    for name, before, after, ratio in regressions:
+        print(f'REGRESSION {name}: p25 {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio:.2f}x)')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,40 +1,135 @@
 class Blogpost:
-    def __init__(self, id, title, body, date=None, user_id=None):
+    __slots__ = ('id', 'title', 'body', 'date', 'user_id', 'version', 'updated_at')
+
+    def __init__(self, id, title, body, date=None, user_id=None, version=None, updated_at=None):
         self.id = id
         self.title = title
         self.body = body
         self.date = date
         self.user_id = user_id
+        self.version = version
+        self.updated_at = updated_at
 
 
 class BSTnode:
+    __slots__ = ('key', 'value', 'left', 'right', 'height')
+
     def __init__(self, key, value=None):
         self.key = key
         self.value = value
         self.left = None
         self.right = None
-        self.parent = None
+        self.height = 1
 
-def insert(node, key, value):
-    if node is None:
-        node = BSTnode(key, value)
-    elif key < node.key:
-        node.left = insert(node.left, key, value)
-        node.left.parent = node
-    elif key > node.key:
-        node.right = insert(node.right, key, value)
-        node.right.parent = node
+def height(node):
+    return node.height if node is not None else 0
+
+def update_height(node):
+    node.height = 1 + max(height(node.left), height(node.right))
+
+def rotate_left(node):
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    update_height(node)
+    update_height(pivot)
+    return pivot
+
+def rotate_right(node):
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    update_height(node)
+    update_height(pivot)
+    return pivot
+
+def rebalance(node):
+    update_height(node)
+    balance = height(node.left) - height(node.right)
+    if balance > 1:
+        if height(node.left.left) < height(node.left.right):
+            node.left = rotate_left(node.left)
+        return rotate_right(node)
+    if balance < -1:
+        if height(node.right.right) < height(node.right.left):
+            node.right = rotate_right(node.right)
+        return rotate_left(node)
     return node
 
-def find(node, key):
+def retrace(path):
+    # walk back up from the deepest touched node, re-linking rotated subtrees,
+    # and stop as soon as a subtree keeps both its root and its height
+    for i in range(len(path) - 1, -1, -1):
+        node = path[i]
+        old_height = node.height
+        subtree = rebalance(node)
+        if i == 0:
+            return subtree
+        parent = path[i - 1]
+        if parent.left is node:
+            parent.left = subtree
+        else:
+            parent.right = subtree
+        if subtree is node and node.height == old_height:
+            break
+    return path[0]
+
+def insert(node, key, value):
     if node is None:
-        return None
-    if key == node.key:
+        return BSTnode(key, value)
+
+    path = []
+    current = node
+    while current is not None:
+        if key == current.key:
+            current.value = value
+            return node
+        path.append(current)
+        current = current.left if key < current.key else current.right
+
+    parent = path[-1]
+    if key < parent.key:
+        parent.left = BSTnode(key, value)
+    else:
+        parent.right = BSTnode(key, value)
+    return retrace(path)
+
+def delete(node, key):
+    path = []
+    target = node
+    while target is not None and key != target.key:
+        path.append(target)
+        target = target.left if key < target.key else target.right
+    if target is None:
         return node
-    if key < node.key:
-        return find(node.left, key)
-    if key > node.key:
-        return find(node.right, key)
+
+    # a node with two children takes over its in-order successor's entry,
+    # and the successor (which has no left child) is unlinked instead
+    if target.left is not None and target.right is not None:
+        path.append(target)
+        successor = target.right
+        while successor.left is not None:
+            path.append(successor)
+            successor = successor.left
+        target.key, target.value = successor.key, successor.value
+        target = successor
+
+    child = target.left if target.left is not None else target.right
+    if not path:
+        return child
+    parent = path[-1]
+    if parent.left is target:
+        parent.left = child
+    else:
+        parent.right = child
+    return retrace(path)
+
+def find(node, key):
+    while node is not None:
+        if key == node.key:
+            return node
+        node = node.left if key < node.key else node.right
+    return None
 
 def update(node, key, value):
     target = find(node, key)
@@ -60,13 +155,74 @@ def display_keys(node, space='\t', level=0):
     print(space * level + str(node.key))
     display_keys(node.left, space, level + 1)
 
+def iter_nodes(node):
+    stack = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+def iter_nodes_reversed(node):
+    stack = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.right
+        node = stack.pop()
+        yield node
+        node = node.left
+
+def iter_range(node, lo=None, hi=None):
+    # in-order over lo <= key < hi (None leaves that side open); subtrees
+    # entirely outside the bounds are never visited
+    stack = []
+    while stack or node is not None:
+        while node is not None:
+            if lo is not None and node.key < lo:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        if not stack:
+            return
+        node = stack.pop()
+        if hi is not None and node.key >= hi:
+            return
+        yield node
+        node = node.right
+
+def floor_node(node, key):
+    best = None
+    while node is not None:
+        if key == node.key:
+            return node
+        if node.key < key:
+            best = node
+            node = node.right
+        else:
+            node = node.left
+    return best
+
+def ceiling_node(node, key):
+    best = None
+    while node is not None:
+        if key == node.key:
+            return node
+        if node.key > key:
+            best = node
+            node = node.left
+        else:
+            node = node.right
+    return best
+
 def list_all(node):
-    if node is None:
-        return []
-    return list_all(node.left) + [(node.key, node.value)] + list_all(node.right)
+    return [(n.key, n.value) for n in iter_nodes(node)]
 
 
-def make_balanced_bst(data, lo=0, hi=None, parent=None):
+def make_balanced_bst(data, lo=0, hi=None):
     if hi is None:
         hi = len(data) - 1
     if lo > hi:
@@ -76,9 +232,9 @@ def make_balanced_bst(data, lo=0, hi=None, parent=None):
     key, value = data[mid]
 
     root = BSTnode(key, value)
-    root.parent = parent
-    root.left = make_balanced_bst(data, lo, mid - 1, root)
-    root.right = make_balanced_bst(data, mid + 1, hi, root)
+    root.left = make_balanced_bst(data, lo, mid - 1)
+    root.right = make_balanced_bst(data, mid + 1, hi)
+    update_height(root)
 
     return root
 
@@ -89,29 +245,90 @@ def balance_bst(node):
 class TreeMap():
     def __init__(self):
         self.root = None
+        self.size = 0
+
+    @classmethod
+    def from_sorted(cls, items):
+        treemap = cls()
+        items = list(items)
+        treemap.root = make_balanced_bst(items)
+        treemap.size = len(items)
+        return treemap
 
     def __setitem__(self, key, value):
         node = find(self.root, key)
         if not node:
             self.root = insert(self.root, key, value)
-            self.root = balance_bst(self.root)
+            self.size += 1
         else:
-            update(self.root, key, value)
+            node.value = value
 
     def __getitem__(self, key):
         node = find(self.root, key)
         return node.value if node else None
 
+    def __delitem__(self, key):
+        if find(self.root, key) is None:
+            raise KeyError(key)
+        self.root = delete(self.root, key)
+        self.size -= 1
+
+    def __contains__(self, key):
+        return find(self.root, key) is not None
+
+    def __len__(self):
+        return self.size
+
     def __iter__(self):
-        return (x for x in list_all(self.root))
+        return ((node.key, node.value) for node in iter_nodes(self.root))
+
+    def __reversed__(self):
+        return ((node.key, node.value) for node in iter_nodes_reversed(self.root))
+
+    def keys(self):
+        return (node.key for node in iter_nodes(self.root))
+
+    def values(self):
+        return (node.value for node in iter_nodes(self.root))
+
+    def range(self, lo=None, hi=None):
+        """Lazily yield the (key, value) pairs with lo <= key < hi, in key order."""
+        return ((node.key, node.value) for node in iter_range(self.root, lo, hi))
+
+    def floor(self, key):
+        """The (key, value) pair with the greatest key <= key, or None."""
+        node = floor_node(self.root, key)
+        return (node.key, node.value) if node else None
+
+    def ceiling(self, key):
+        """The (key, value) pair with the smallest key >= key, or None."""
+        node = ceiling_node(self.root, key)
+        return (node.key, node.value) if node else None
+
+    def nearest(self, key):
+        """The (key, value) pair whose key is closest to key; ties go to the smaller key."""
+        below = floor_node(self.root, key)
+        above = ceiling_node(self.root, key)
+        if below is None or above is None:
+            node = below or above
+        else:
+            node = below if key - below.key <= above.key - key else above
+        return (node.key, node.value) if node else None
 
     def search(self, key):
         return find(self.root, key)
 
+    def remove(self, key):
+        if find(self.root, key) is None:
+            return False
+        self.root = delete(self.root, key)
+        self.size -= 1
+        return True
+
     def display(self):
         return display_keys(self.root)
 
 """treemap = TreeMap()
 treemap['1'] = Blogpost(id=1, title='aakash', body='Aakash Rai', date='aakash@example.com')
 treemap['2'] = Blogpost(id=2, title='biraj', body='Biraj Das', date='biraj@example.com')
-treemap.display()"""
\ No newline at end of file
+treemap.display()"""
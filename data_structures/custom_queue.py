@@ -1,4 +1,6 @@
 class Node:
+    __slots__ = ('data', 'next_node')
+
     def __init__(self, data, next_node):
         self.data = data
         self.next_node = next_node
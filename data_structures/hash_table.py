@@ -1,48 +1,110 @@
-class Node:
-    def __init__(self, data=None, next_node=None):
-        self.data = data
-        self.next_node = next_node
-
 class Data:
-    def __init__(self, key, value):
+    __slots__ = ('key', 'value', 'hash')
+
+    def __init__(self, key, value, hash_value):
         self.key = key
         self.value = value
+        self.hash = hash_value
 
 class HashTable:
-    def __init__(self, table_size):
+    # open addressing with robin-hood linear probing: an entry that is
+    # further from its home slot takes the place of a closer one, which keeps
+    # probe sequences short and lets lookups stop early on a miss
+
+    max_load = 0.75
+
+    def __init__(self, table_size=8):
+        capacity = 8
+        while capacity < table_size:
+            capacity *= 2
+        self.table_size = capacity
+        self.hash_table = [None] * capacity
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return self.find_slot(key) is not None
+
+    def __iter__(self):
+        return ((entry.key, entry.value) for entry in self.hash_table if entry is not None)
+
+    def custom_hash(self, key):
+        return hash(key)
+
+    def resize(self, table_size):
+        entries = [entry for entry in self.hash_table if entry is not None]
         self.table_size = table_size
         self.hash_table = [None] * table_size
+        for entry in entries:
+            self.place(entry)
 
-    def custom_hash(self, key):
-        hash_value = 0
-        for i in key:
-            hash_value += ord(i)
-            hash_value = (hash_value*ord(i)) % self.table_size
-        return hash_value
+    def place(self, entry):
+        table = self.hash_table
+        mask = self.table_size - 1
+        index = entry.hash & mask
+        distance = 0
+        while True:
+            slot = table[index]
+            if slot is None:
+                table[index] = entry
+                return
+            slot_distance = (index - slot.hash) & mask
+            if slot_distance < distance:
+                table[index], entry = entry, slot
+                distance = slot_distance
+            index = (index + 1) & mask
+            distance += 1
 
-    def add_key_value(self, key, value):
+    def find_slot(self, key):
         hashed_key = self.custom_hash(key)
-        if self.hash_table[hashed_key] is None:
-            self.hash_table[hashed_key] = Node(Data(key, value), None)
-        else:
-            node = self.hash_table[hashed_key]
-            while node.next_node:
-                node = node.next_node
-            node.next_node = Node(Data(key, value), None)
+        table = self.hash_table
+        mask = self.table_size - 1
+        index = hashed_key & mask
+        distance = 0
+        while True:
+            slot = table[index]
+            if slot is None or distance > ((index - slot.hash) & mask):
+                return None
+            if slot.hash == hashed_key and slot.key == key:
+                return index
+            index = (index + 1) & mask
+            distance += 1
+
+    def add_key_value(self, key, value):
+        index = self.find_slot(key)
+        if index is not None:
+            self.hash_table[index].value = value
+            return
+
+        if self.size + 1 > self.table_size * self.max_load:
+            self.resize(self.table_size * 2)
+        self.place(Data(key, value, self.custom_hash(key)))
+        self.size += 1
 
         return
 
     def get_value(self, key):
-        hashed_key = self.custom_hash(key)
-        if self.hash_table[hashed_key] is not None:
-            node = self.hash_table[hashed_key]
-            if node.next_node is None:
-                return node.data.value
-            while node.next_node:
-                if key == node.data.key:
-                    return node.data.value
-                node = node.next_node
-            if key == node.data.key:
-                return node.data.value
-
-            return None
\ No newline at end of file
+        index = self.find_slot(key)
+        if index is None:
+            return None
+        return self.hash_table[index].value
+
+    def delete_key(self, key):
+        index = self.find_slot(key)
+        if index is None:
+            return False
+
+        # backward-shift the following entries instead of leaving a tombstone
+        table = self.hash_table
+        mask = self.table_size - 1
+        next_index = (index + 1) & mask
+        while table[next_index] is not None and ((next_index - table[next_index].hash) & mask) != 0:
+            table[index] = table[next_index]
+            index = next_index
+            next_index = (next_index + 1) & mask
+        table[index] = None
+        self.size -= 1
+
+        return True
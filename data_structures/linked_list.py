@@ -1,4 +1,6 @@
 class Node:
+    __slots__ = ('data', 'next_node')
+
     def __init__(self, data=None, next_node=None):
         self.data = data
         self.next_node = next_node
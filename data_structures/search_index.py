@@ -0,0 +1,60 @@
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    def __init__(self):
+        self.documents = {}
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def add(self, doc_id, text):
+        text = text or ''
+        if doc_id in self.documents:
+            if self.documents[doc_id] == text:
+                return
+            self.remove(doc_id)
+        self.documents[doc_id] = text
+        for gram in trigrams(text):
+            posting = self.postings.get(gram)
+            if posting is None:
+                self.postings[gram] = {doc_id}
+            else:
+                posting.add(doc_id)
+
+    def remove(self, doc_id):
+        text = self.documents.pop(doc_id, None)
+        if text is None:
+            return False
+        for gram in trigrams(text):
+            posting = self.postings[gram]
+            posting.discard(doc_id)
+            if not posting:
+                del self.postings[gram]
+        return True
+
+    def search(self, query):
+        # substring match, same semantics as a case-sensitive LIKE '%query%';
+        # returns matching ids in descending order, or None when the query is
+        # too short to be answered from trigrams
+        grams = trigrams(query)
+        if not grams:
+            return None
+
+        posting_lists = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if not posting:
+                return []
+            posting_lists.append(posting)
+        posting_lists.sort(key=len)
+
+        candidates = posting_lists[0].intersection(*posting_lists[1:])
+
+        documents = self.documents
+        return sorted((doc_id for doc_id in candidates if query in documents[doc_id]), reverse=True)
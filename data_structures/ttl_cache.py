@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class TTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            # least recently used entries go first once the cache is full
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
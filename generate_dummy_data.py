@@ -1,44 +1,193 @@
-from random import randrange
-from datetime import datetime
+"""Seed the database with synthetic users and blog posts.
+
+    python generate_dummy_data.py --users 10000 --posts 1000000 --workers 8 --seed 42
+
+Rows are generated with Faker in a process pool, one deterministic chunk
+per task, and written in batched multi-row inserts (COPY on PostgreSQL).
+Ids are assigned explicitly, so the same --seed and --chunk-size produce the
+same dataset on SQLite and PostgreSQL. Synthetic users share a small pool of
+precomputed password hashes; user N's password is 'password<N % pool>'.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import os
+import random
+import string
+from datetime import date
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from faker import Faker
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, func, select, text
 from app.config import config_dict
-from app.models import User, BlogPost
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
-
-# app
-app = Flask(__name__)
-
-# config
-app.config.from_object(config_dict['dev'])
-
-db = SQLAlchemy(app)
-now = datetime.now()
-
-faker = Faker()
-
-# create dummy users
-for i in range(200):
-    name = faker.name()
-    address = faker.address()
-    phone = faker.msisdn()
-    email = f'{name.replace(" ", "_")}@email.com'
-    password_hash = generate_password_hash(f'{name}@password123')
-    new_user = User(name=name, address=address, phone=phone, email=email, password_hash=password_hash)
-    db.session.add(new_user)
-    db.session.commit()
-
-# create dummy blog posts
-for i in range(200):
-    title = faker.sentence(5)
-    body = faker.paragraph(190)
-    date = faker.date_time()
-    user_id = randrange(1, 200)
-
-    new_blog_post = BlogPost(
-        title=title, body=body, date=date, user_id=user_id
-    )
-    db.session.add(new_blog_post)
-    db.session.commit()
+from app.models import ChangeCounter, User, BlogPost, db
+from app.numeric_body import numeric_bodies
+
+
+def chunk_seed(seed, table, index):
+    return seed * 1000003 + (0 if table == 'users' else 500009) + index
+
+
+def shared_password_hashes(seed, count, iterations):
+    # the same pbkdf2 format werkzeug writes, with seeded salts so the hashes
+    # are reproducible
+    rng = random.Random(seed)
+    hashes = []
+    for n in range(count):
+        salt = ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(16))
+        digest = hashlib.pbkdf2_hmac('sha256', f'password{n}'.encode(), salt.encode(), iterations).hex()
+        hashes.append(f'pbkdf2:sha256:{iterations}${salt}${digest}')
+    return hashes
+
+
+def generate_users(task):
+    seed, index, first_id, count, password_hashes = task
+    faker = Faker()
+    faker.seed_instance(chunk_seed(seed, 'users', index))
+    rows = []
+    for user_id in range(first_id, first_id + count):
+        name = faker.name()
+        rows.append({
+            'id': user_id,
+            'name': name,
+            'email': f'{name.replace(" ", "_")}.{user_id}@email.com',
+            'password_hash': password_hashes[user_id % len(password_hashes)],
+            'address': faker.address(),
+            'phone': faker.msisdn()
+        })
+    return rows
+
+
+def generate_posts(task):
+    seed, index, first_id, count, users, body_sentences = task
+    faker = Faker()
+    faker.seed_instance(chunk_seed(seed, 'posts', index))
+    rng = random.Random(chunk_seed(seed, 'posts', index))
+    rows = []
+    for post_id in range(first_id, first_id + count):
+        rows.append({
+            'id': post_id,
+            'title': faker.sentence(5),
+            'body': faker.paragraph(body_sentences),
+            'date': faker.date_between_dates(date(2000, 1, 1), date(2022, 12, 31)),
+            'user_id': rng.randint(1, users),
+            # set explicitly: the Core insert would otherwise fill updated_at
+            # from the model's Python default while COPY leaves it NULL
+            'version': 1,
+            'updated_at': None
+        })
+    for row, value in zip(rows, numeric_bodies(row['body'] for row in rows)):
+        row['numeric_body'] = value
+    return rows
+
+
+def chunks(seed, total, chunk_size, first_id=1):
+    for index, start in enumerate(range(0, total, chunk_size)):
+        yield seed, index, first_id + start, min(chunk_size, total - start)
+
+
+def ordered_results(pool, fn, tasks, window):
+    # like pool.map, but keeps at most `window` chunks in flight so generated
+    # rows never pile up faster than they are inserted
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    for future in pending:
+        yield future.result()
+
+
+def copy_rows(engine, table, rows):
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH CSV', buffer)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def insert_rows(engine, table, rows, batch_size, use_copy):
+    if use_copy:
+        return copy_rows(engine, table, rows)
+    with engine.begin() as connection:
+        for start in range(0, len(rows), batch_size):
+            connection.execute(table.insert(), rows[start:start + batch_size])
+
+
+def reset_sequences(engine):
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as connection:
+        for table in (User.__table__, BlogPost.__table__):
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+            ))
+
+
+def bump_change_counters(engine):
+    # rows written outside the ORM still have to invalidate cached listings
+    with engine.begin() as connection:
+        connection.execute(ChangeCounter.bump_statement(ChangeCounter.tracked))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='generator processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='rows generated per task')
+    parser.add_argument('--batch-size', type=int, default=500, help='rows per multi-row INSERT')
+    parser.add_argument('--body-sentences', type=int, default=190)
+    parser.add_argument('--password-pool', type=int, default=16, help='distinct precomputed password hashes')
+    parser.add_argument('--hash-iterations', type=int, default=260000)
+    parser.add_argument('--config', choices=sorted(config_dict), default='dev')
+    parser.add_argument('--database-url', help="overrides the config's SQLALCHEMY_DATABASE_URI")
+    parser.add_argument('--create-tables', action='store_true', help='create missing tables instead of relying on migrations')
+    parser.add_argument('--no-copy', action='store_true', help='use INSERTs even when COPY is available')
+    args = parser.parse_args()
+    if args.posts and not args.users:
+        parser.error('posts need at least one user')
+
+    engine = create_engine(args.database_url or config_dict[args.config].SQLALCHEMY_DATABASE_URI)
+    if args.create_tables:
+        db.metadata.create_all(engine)
+    with engine.connect() as connection:
+        if connection.execute(select(func.count()).select_from(User.__table__)).scalar():
+            parser.error('the users table is not empty; seed into an empty database')
+    use_copy = engine.dialect.name == 'postgresql' and not args.no_copy
+
+    password_hashes = shared_password_hashes(args.seed, args.password_pool, args.hash_iterations)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        window = 2 * (args.workers or os.cpu_count() or 1)
+
+        user_tasks = (task + (password_hashes,) for task in chunks(args.seed, args.users, args.chunk_size))
+        for rows in ordered_results(pool, generate_users, user_tasks, window):
+            insert_rows(engine, User.__table__, rows, args.batch_size, use_copy)
+            print(f'users: {rows[-1]["id"]}/{args.users}')
+
+        post_tasks = (
+            task + (args.users, args.body_sentences) for task in chunks(args.seed, args.posts, args.chunk_size)
+        )
+        for rows in ordered_results(pool, generate_posts, post_tasks, window):
+            insert_rows(engine, BlogPost.__table__, rows, args.batch_size, use_copy)
+            print(f'posts: {rows[-1]["id"]}/{args.posts}')
+
+    reset_sequences(engine)
+    bump_change_counters(engine)
+
+
+if __name__ == '__main__':
+    main()
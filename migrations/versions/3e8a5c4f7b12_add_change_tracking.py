@@ -0,0 +1,43 @@
+"""Add blog post versions and per-table change counters.
+
+Revision ID: 3e8a5c4f7b12
+Revises: 9f4b7e21c3d8
+Create Date: 2026-10-18 17:20:41.208733
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8a5c4f7b12'
+down_revision = '9f4b7e21c3d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    change_counters = op.create_table('change_counters',
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(change_counters, [
+        {'table_name': 'users', 'version': 0, 'updated_at': now},
+        {'table_name': 'blog_posts', 'version': 0, 'updated_at': now}
+    ])
+
+    # existing posts start at version 1 with no updated_at; they get one on
+    # their next write and are served without Last-Modified until then
+    op.add_column('blog_posts', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('blog_posts', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('blog_posts', 'updated_at')
+    op.drop_column('blog_posts', 'version')
+
+    op.drop_table('change_counters')
@@ -0,0 +1,30 @@
+"""Index blog_posts on (date, id) for the date range listing.
+
+Revision ID: 5b2e9d7c1f30
+Revises: 3e8a5c4f7b12
+Create Date: 2026-10-18 18:41:07.310254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e9d7c1f30'
+down_revision = '3e8a5c4f7b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the (date, id) index serves everything the date index did, so the old
+    # one is dropped once its replacement is built
+    with op.get_context().autocommit_block():
+        op.create_index('ix_blog_posts_date_id', 'blog_posts', ['date', 'id'], postgresql_concurrently=True)
+        op.drop_index('ix_blog_posts_date', table_name='blog_posts', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_blog_posts_date', 'blog_posts', ['date'], postgresql_concurrently=True)
+        op.drop_index('ix_blog_posts_date_id', table_name='blog_posts', postgresql_concurrently=True)
@@ -0,0 +1,33 @@
+"""Add blog_posts.numeric_body.
+
+Revision ID: 6c1d2f0e9a41
+Revises: 20b4089ed76d
+Create Date: 2026-10-18 10:12:41.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.numeric_body import recompute_numeric_bodies
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1d2f0e9a41'
+down_revision = '20b4089ed76d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('blog_posts', sa.Column('numeric_body', sa.BigInteger(), nullable=True))
+
+    blog_posts = sa.table(
+        'blog_posts',
+        sa.column('id', sa.Integer()),
+        sa.column('body', sa.String()),
+        sa.column('numeric_body', sa.BigInteger())
+    )
+    recompute_numeric_bodies(op.get_bind(), blog_posts)
+
+
+def downgrade():
+    op.drop_column('blog_posts', 'numeric_body')
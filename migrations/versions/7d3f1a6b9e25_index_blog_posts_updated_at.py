@@ -0,0 +1,26 @@
+"""Index blog_posts on updated_at for the post index catch-up.
+
+Revision ID: 7d3f1a6b9e25
+Revises: 5b2e9d7c1f30
+Create Date: 2026-10-18 21:12:43.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f1a6b9e25'
+down_revision = '5b2e9d7c1f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_blog_posts_updated_at', 'blog_posts', ['updated_at'], postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_blog_posts_updated_at', table_name='blog_posts', postgresql_concurrently=True)
@@ -0,0 +1,65 @@
+"""Add indexes for the email, user and date lookups.
+
+Revision ID: 9f4b7e21c3d8
+Revises: 6c1d2f0e9a41
+Create Date: 2026-10-18 16:02:55.472913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f4b7e21c3d8'
+down_revision = '6c1d2f0e9a41'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = ('ix_users_email', 'ix_blog_posts_user_id_id', 'ix_blog_posts_date')
+
+
+def check_duplicate_emails():
+    # signups did not check for an existing email before this revision, so
+    # the unique index cannot be built until the duplicates are resolved
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT email, count(*) FROM users WHERE email IS NOT NULL '
+        'GROUP BY email HAVING count(*) > 1 ORDER BY email'
+    )).all()
+    if duplicates:
+        listed = ', '.join(f'{email} ({count} rows)' for email, count in duplicates[:20])
+        raise RuntimeError(
+            f'users.email holds {len(duplicates)} duplicated addresses; merge or delete those '
+            f'accounts before creating the unique ix_users_email: {listed}'
+        )
+
+
+def drop_invalid_indexes():
+    # a failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind,
+    # which would make the retry fail with "already exists"
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    invalid = bind.execute(sa.text(
+        'SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE NOT i.indisvalid AND c.relname IN :names'
+    ).bindparams(sa.bindparam('names', expanding=True)), {'names': list(INDEXES)}).scalars().all()
+    for name in invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def upgrade():
+    check_duplicate_emails()
+    # built outside a transaction so PostgreSQL can create them CONCURRENTLY
+    # without locking writes
+    with op.get_context().autocommit_block():
+        drop_invalid_indexes()
+        op.create_index('ix_users_email', 'users', ['email'], unique=True, postgresql_concurrently=True)
+        op.create_index('ix_blog_posts_user_id_id', 'blog_posts', ['user_id', sa.text('id DESC')], postgresql_concurrently=True)
+        op.create_index('ix_blog_posts_date', 'blog_posts', ['date'], postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_blog_posts_date', table_name='blog_posts')
+    op.drop_index('ix_blog_posts_user_id_id', table_name='blog_posts')
+    op.drop_index('ix_users_email', table_name='users')